@@ -4,5 +4,63 @@ import os
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
 JWT_SECRET = os.getenv("JWT_SECRET")
-JWT_ALGORITHM = "HS256"
\ No newline at end of file
+JWT_ALGORITHM = "HS256"
+
+BULK_UPLOAD_CHUNK_SIZE = int(os.getenv("BULK_UPLOAD_CHUNK_SIZE", "500"))
+BULK_UPLOAD_JOB_WORKERS = int(os.getenv("BULK_UPLOAD_JOB_WORKERS", "2"))
+BULK_UPLOAD_JOB_DB_CONCURRENCY = int(os.getenv("BULK_UPLOAD_JOB_DB_CONCURRENCY", "1"))
+BULK_UPLOAD_JOB_MAX_ERRORS = int(os.getenv("BULK_UPLOAD_JOB_MAX_ERRORS", "1000"))
+BULK_UPLOAD_JOB_HISTORY = int(os.getenv("BULK_UPLOAD_JOB_HISTORY", "1000"))
+BULK_UPLOAD_JOB_MAX_QUEUED = int(os.getenv("BULK_UPLOAD_JOB_MAX_QUEUED", "16"))
+BULK_UPLOAD_JOB_MAX_RECORDS = int(os.getenv("BULK_UPLOAD_JOB_MAX_RECORDS", "1000000"))
+BULK_UPLOAD_JOB_RETRY_AFTER = int(os.getenv("BULK_UPLOAD_JOB_RETRY_AFTER", "30"))
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "local")
+BOOK_BATCH_MAX_IDS = int(os.getenv("BOOK_BATCH_MAX_IDS", "100"))
+EXPORT_PARTITION_SIZE = int(os.getenv("EXPORT_PARTITION_SIZE", "1000"))
+AUTHOR_RESOLVE_WINDOW_MS = float(os.getenv("AUTHOR_RESOLVE_WINDOW_MS", "2"))
+AUTHOR_RESOLVE_CONCURRENCY = int(os.getenv("AUTHOR_RESOLVE_CONCURRENCY", "1"))
+AUTHOR_CACHE_SIZE = int(os.getenv("AUTHOR_CACHE_SIZE", "10000"))
+CATALOG_SNAPSHOT_ENABLED = os.getenv("CATALOG_SNAPSHOT_ENABLED", "false").lower() in ("1", "true", "yes")
+CATALOG_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("CATALOG_SNAPSHOT_REFRESH_SECONDS", "5"))
+CATALOG_SNAPSHOT_MAX_CHANGES = int(os.getenv("CATALOG_SNAPSHOT_MAX_CHANGES", "5000"))
+CATALOG_CHANGES_RETENTION_SECONDS = float(os.getenv("CATALOG_CHANGES_RETENTION_SECONDS", "3600"))
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Below DB_POOL_SIZE + DB_MAX_OVERFLOW, so a burst of logins cannot queue more requests than the pool serves.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "8"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
+
+JWT_BACKEND = os.getenv("JWT_BACKEND", "jose")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "15"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+FACET_TOP_AUTHORS = int(os.getenv("FACET_TOP_AUTHORS", "10"))
+
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() in ("1", "true", "yes")
+# route class=concurrency/queue length/max queue wait in ms. The gates only bound requests: author resolver
+# flushes, bulk upload job chunks and the catalog snapshot loader and change log take connections outside them.
+ADMISSION_LIMITS = os.getenv("ADMISSION_LIMITS",
+                             "point=16/64/250,list=5/32/1000,heavy=2/8/2000,bulk=2/4/5000,write=4/32/2000")
+# Pool connections that all of the above together must leave to point reads; checked at startup.
+ADMISSION_POINT_RESERVE = int(os.getenv("ADMISSION_POINT_RESERVE", "3"))
+ADMISSION_DEEP_OFFSET = int(os.getenv("ADMISSION_DEEP_OFFSET", "1000"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_SLOW_REQUEST_MS = float(os.getenv("PROFILING_SLOW_REQUEST_MS", "500"))
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_OUTPUT_DIR = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
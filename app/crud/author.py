@@ -0,0 +1,144 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import String, any_, bindparam, func, select
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert as pg_insert
+import uuid
+from app.config import AUTHOR_CACHE_SIZE, AUTHOR_RESOLVE_CONCURRENCY, AUTHOR_RESOLVE_WINDOW_MS
+from app.database import async_session
+from app.models.model_base import Author
+
+
+async def _lookup_authors(db, names) -> Dict[str, uuid.UUID]:
+    names = bindparam("names", list(names), type_=ARRAY(String))
+    result = await db.execute(select(Author.id, Author.name).where(Author.name == any_(names)))
+    return {name: author_id for author_id, name in result.all()}
+
+
+async def lookup_or_create_authors(db, names: Iterable[str]) -> Tuple[Dict[str, uuid.UUID], int]:
+    """Ids of ``names``, inserting the missing authors in ``db``'s transaction; also returns how many it inserted.
+
+    Names travel as array parameters, so any number of them fits in asyncpg's bind limit. Rows skipped by
+    ``ON CONFLICT DO NOTHING`` were inserted by a concurrent transaction that has committed by then, so a
+    second lookup finds them; unlike ``DO UPDATE`` this leaves no dead tuples and fires no update triggers.
+    """
+    # Sorted so concurrent inserts take the unique index locks in the same order.
+    names = sorted(set(names))
+    if not names:
+        return {}, 0
+    ids = await _lookup_authors(db, names)
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return ids, 0
+    rows = func.unnest(
+        bindparam("ids", [uuid.uuid4() for _ in missing], type_=ARRAY(UUID(as_uuid=True))),
+        bindparam("missing", missing, type_=ARRAY(String)),
+    ).table_valued("id", "name")
+    result = await db.execute(
+        pg_insert(Author)
+        .from_select(["id", "name"], select(rows.c.id, rows.c.name))
+        .on_conflict_do_nothing(index_elements=[Author.name])
+        .returning(Author.id, Author.name)
+    )
+    created = {name: author_id for author_id, name in result.all()}
+    ids.update(created)
+    raced = [name for name in missing if name not in created]
+    if raced:
+        ids.update(await _lookup_authors(db, raced))
+    return ids, len(created)
+
+
+class AuthorResolver:
+    """Maps author names to ids, creating missing authors, for all in-flight writes at once.
+
+    Names requested within ``window`` seconds of each other are resolved by one
+    ``lookup_or_create_authors`` call in a short transaction of their own, so concurrent writers
+    neither repeat the same SELECTs nor block each other on the unique constraint. Resolved ids are kept in a bounded LRU; callers
+    ``forget`` names whose authors were deleted, and retry on a foreign key error when another
+    process deleted one first. At most ``concurrency`` batches hold a connection at a time.
+    """
+
+    def __init__(self, session_factory=async_session, window: float = AUTHOR_RESOLVE_WINDOW_MS / 1000,
+                 cache_size: int = AUTHOR_CACHE_SIZE, concurrency: int = AUTHOR_RESOLVE_CONCURRENCY):
+        self.session_factory = session_factory
+        self._slots = asyncio.Semaphore(concurrency)
+        self.window = window
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, uuid.UUID]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._flush_scheduled = False
+        self._flushes = set()
+        self.batches = self.created = self.cache_hits = 0
+
+    async def resolve(self, names: Iterable[str]) -> Dict[str, uuid.UUID]:
+        resolved, waiting = {}, {}
+        for name in set(names):
+            author_id = self._cached(name)
+            if author_id is not None:
+                resolved[name] = author_id
+                continue
+            future = self._pending.get(name)
+            if future is None:
+                future = self._pending[name] = asyncio.get_running_loop().create_future()
+            waiting[name] = future
+        if waiting and not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_later(self.window, self._start_flush)
+        for name, future in waiting.items():
+            # Shielded: the batch is shared, so one cancelled caller must not fail the others.
+            resolved[name] = await asyncio.shield(future)
+        return resolved
+
+    def forget(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._cache.pop(name, None)
+
+    def _cached(self, name: str) -> Optional[uuid.UUID]:
+        author_id = self._cache.get(name)
+        if author_id is not None:
+            self._cache.move_to_end(name)
+            self.cache_hits += 1
+        return author_id
+
+    def _remember(self, ids: Dict[str, uuid.UUID]) -> None:
+        for name, author_id in ids.items():
+            self._cache[name] = author_id
+            self._cache.move_to_end(name)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _start_flush(self):
+        self._flush_scheduled = False
+        batch, self._pending = self._pending, {}
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: Dict[str, asyncio.Future]):
+        try:
+            ids = await self._lookup_or_create(sorted(batch))
+            self._remember(ids)
+            for name, future in batch.items():
+                if not future.done():
+                    future.set_result(ids[name])
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    # Retrieved here so a failure nobody awaits any more is not logged as unhandled.
+                    future.exception()
+
+    async def _lookup_or_create(self, names) -> Dict[str, uuid.UUID]:
+        self.batches += 1
+        async with self._slots, self.session_factory() as db:
+            ids, created = await lookup_or_create_authors(db, names)
+            await db.commit()
+        self.created += created
+        return ids
+
+    def stats(self) -> dict:
+        return {"cached_names": len(self._cache), "max_cached_names": self.cache_size, "cache_hits": self.cache_hits,
+                "batches": self.batches, "created": self.created, "pending": len(self._pending)}
+
+
+author_resolver = AuthorResolver()
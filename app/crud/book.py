@@ -1,62 +1,306 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, func
-from sqlalchemy.orm import joinedload
-from app.models.model_base import Book, Author, book_authors
+from sqlalchemy import (select, delete, update, func, insert, literal, literal_column, tuple_, union_all, cast, false, text,
+                        BigInteger, String, UUID)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from app.config import BULK_UPLOAD_CHUNK_SIZE, EXPORT_PARTITION_SIZE, FACET_TOP_AUTHORS
+from app.crud.author import author_resolver, lookup_or_create_authors
+from app.crud.snapshot import CATALOG_VERSION, catalog_snapshot
+from app.models.model_base import Book, Author, FacetCount, book_authors
 from app.schemas.book import BookCreate, BookUpdate
-from typing import List, Optional
+from app.utils.cache import GENERATION_KEY, book_key, cache, invalidate_books, invalidate_catalog, query_key
+from app.utils.cursor import decode_cursor, encode_cursor
+from app.utils.enum import GENRE_CODES, Genre
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import json
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChunkStats:
+    chunk: int
+    books: int
+    authors: int
+    links: int
+    seconds: float
+
+
+@dataclass
+class BulkUploadResult:
+    books: List[dict] = field(default_factory=list)
+    chunks: List[ChunkStats] = field(default_factory=list)
 
 
 async def create_book(db: AsyncSession, book: BookCreate):
-    author_objs = []
-    for name in book.author_names:
-        author = (await db.execute(select(Author).filter_by(name=name))).scalar_one_or_none()
-        if not author:
-            author = Author(name=name)
-            db.add(author)
-        author_objs.append(author)
-    await db.flush()
-
-    db_book = Book(title=book.title, published_year=book.published_year, genres=book.genres)
-    db.add(db_book)
-    await db.flush()
-
-    for author in author_objs:
-        await db.execute(book_authors.insert().values(book_id=db_book.id, author_id=author.id))
-
-    result = await db.execute(select(Book).options(joinedload(Book.authors)).filter_by(id=db_book.id))
-    db_book = result.unique().scalar_one()
-    await db.commit()
+    names = list(dict.fromkeys(book.author_names))
+    for attempt in range(2):
+        author_ids = await author_resolver.resolve(names)
+        book_id = uuid.uuid4()
+        try:
+            await db.execute(insert(Book).values(id=book_id, title=book.title, published_year=book.published_year,
+                                                 genres=book.genres))
+            await db.execute(insert(book_authors).values(
+                [{"book_id": book_id, "author_id": author_ids[name]} for name in names]
+            ))
+            await db.commit()
+            break
+        except IntegrityError:
+            # A cached author was deleted meanwhile (by another worker); resolve afresh once.
+            await db.rollback()
+            author_resolver.forget(names)
+            if attempt:
+                raise
+    await invalidate_catalog()
+    return await get_book(db, book_id)
 
-    return db_book
 
+GENRE_NAMES = frozenset(genre.value for genre in Genre)
+SORT_COLUMNS = {"title": Book.title, "published_year": Book.published_year}
 
-async def get_books(db: AsyncSession, skip: int = 0, limit: int = 10, sort_by: str = "title",
-                    title: Optional[str] = None, author: Optional[str] = None, genre: Optional[str] = None,
-                    year_from: Optional[int] = None, year_to: Optional[int] = None):
-    query = select(Book).options(joinedload(Book.authors)).offset(skip).limit(limit)
+
+def _sort_column(sort_by: str):
+    if sort_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort by '{sort_by}'")
+    return SORT_COLUMNS[sort_by]
+
+
+def _contains_pattern(term: str) -> str:
+    # Backslash is Postgres' default LIKE escape character.
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _filter_books(query, title: Optional[str] = None, author: Optional[str] = None, genre: Optional[str] = None,
+                  year_from: Optional[int] = None, year_to: Optional[int] = None):
     if title:
-        query = query.filter(Book.title.ilike(f"%{title}%"))
+        query = query.filter(Book.title.ilike(_contains_pattern(title)))
     if author:
-        query = query.join(book_authors).join(Author).filter(Author.name.ilike(f"%{author}%"))
+        # EXISTS rather than a join so a book matching several authors still yields one row.
+        query = query.filter(
+            select(book_authors.c.book_id)
+            .join(Author, Author.id == book_authors.c.author_id)
+            .where(book_authors.c.book_id == Book.id, Author.name.ilike(_contains_pattern(author)))
+            .exists()
+        )
     if genre:
         genres_list = genre.split(",") if genre else []
-        if genres_list:
+        if any(name not in GENRE_NAMES for name in genres_list):
+            # No stored book can carry a genre outside the enum.
+            query = query.filter(false())
+        elif genres_list:
             query = query.filter(Book.genres.contains(genres_list))
     if year_from:
         query = query.filter(Book.published_year >= year_from)
     if year_to:
         query = query.filter(Book.published_year <= year_to)
-    if sort_by:
-        query = query.order_by(getattr(Book, sort_by))
-    result = await db.execute(query)
-    books = result.unique().scalars().all()
-    return [{
+    return query
+
+
+def _filter_params(title: Optional[str], author: Optional[str], genre: Optional[str],
+                   year_from: Optional[int], year_to: Optional[int]) -> dict:
+    # Normalised so equivalent filter combinations share a cache entry.
+    return {
+        "title": title.lower() if title else None,
+        "author": author.lower() if author else None,
+        "genre": sorted(set(genre.split(","))) if genre else None,
+        "year_from": year_from or None,
+        "year_to": year_to or None,
+    }
+
+
+def _book_dict(book: Book) -> dict:
+    return {
         "id": book.id,
         "title": book.title,
         "published_year": book.published_year,
         "genres": book.genres,
         "authors": [author.name for author in book.authors]
-    } for book in books]
+    }
+
+
+LIST_COLUMNS = (Book.id, Book.title, Book.published_year, Book.genres)
+
+
+def _with_authors(page):
+    # Phase two of a listing: the page of books is already chosen, so author names are
+    # aggregated for those rows only, without building ORM objects.
+    authors = (
+        select(func.array_agg(Author.name))
+        .join(book_authors, book_authors.c.author_id == Author.id)
+        .where(book_authors.c.book_id == page.c.id)
+        .scalar_subquery()
+    )
+    return select(page.c.id, page.c.title, page.c.published_year, page.c.genres, authors.label("authors"))
+
+
+def _row_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "title": row.title,
+        "published_year": row.published_year,
+        "genres": row.genres,
+        "authors": row.authors or []
+    }
+
+
+def _book_data(book: Book) -> dict:
+    # Single-book payload as cached under book_key(); the version backs its ETag.
+    data = _book_dict(book)
+    data["version"] = book.version
+    return data
+
+
+async def _catalog_version(db: AsyncSession, catalog_version: Optional[int]) -> int:
+    # Routers that answered a conditional GET pass the version they read; others pay one read here.
+    return await get_catalog_version(db) if catalog_version is None else catalog_version
+
+
+async def get_books(db: AsyncSession, skip: int = 0, limit: int = 10, sort_by: str = "title",
+                    title: Optional[str] = None, author: Optional[str] = None, genre: Optional[str] = None,
+                    year_from: Optional[int] = None, year_to: Optional[int] = None,
+                    catalog_version: Optional[int] = None):
+    sort_column = _sort_column(sort_by)
+    catalog_version = await _catalog_version(db, catalog_version)
+    key = await query_key("books", catalog_version, skip=skip, limit=limit, sort_by=sort_by,
+                          **_filter_params(title, author, genre, year_from, year_to))
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+    books = None
+    snapshot = catalog_snapshot.current(catalog_version)
+    if snapshot is not None:
+        books = snapshot.query(sort_by, skip, limit, title, author, genre, year_from, year_to)
+    if books is None:
+        page = _filter_books(select(*LIST_COLUMNS), title, author, genre, year_from, year_to)
+        page = page.order_by(sort_column, Book.id).offset(skip).limit(limit).subquery()
+        result = await db.execute(_with_authors(page).order_by(page.c[sort_by], page.c.id))
+        books = [_row_dict(row) for row in result]
+    await cache.set(key, books)
+    return books
+
+
+def _after(query, sort_column, after: Optional[Tuple], limit: int):
+    # NULLs sort last, as in the (sort column, id) indexes. A row comparison against NULL is NULL,
+    # so NULL rows get their own branch, also an index range scan, instead of ending the listing.
+    if after is None:
+        return query.order_by(sort_column, Book.id).limit(limit)
+    last_value, last_id = after
+    last_id = literal(last_id, Book.id.type)
+    if last_value is None:
+        return query.filter(sort_column.is_(None), Book.id > last_id).order_by(Book.id).limit(limit)
+    following = query.filter(tuple_(sort_column, Book.id) > tuple_(literal(last_value, sort_column.type), last_id))
+    following = following.order_by(sort_column, Book.id).limit(limit)
+    if not sort_column.nullable:
+        return following
+    undated = query.filter(sort_column.is_(None)).order_by(Book.id).limit(limit)
+    rows = union_all(following, undated).subquery()
+    return select(rows).order_by(rows.c[sort_column.key], rows.c.id).limit(limit)
+
+
+async def get_books_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 10, sort_by: str = "title",
+                         title: Optional[str] = None, author: Optional[str] = None, genre: Optional[str] = None,
+                         year_from: Optional[int] = None, year_to: Optional[int] = None,
+                         catalog_version: Optional[int] = None):
+    """Keyset pagination on ``(sort_by, id)``: every page costs one index range scan regardless of depth."""
+    sort_column = _sort_column(sort_by)
+    catalog_version = await _catalog_version(db, catalog_version)
+    key = await query_key("books-page", catalog_version, cursor=cursor, limit=limit, sort_by=sort_by,
+                          **_filter_params(title, author, genre, year_from, year_to))
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+    after = decode_cursor(cursor, sort_by) if cursor else None
+    books = None
+    snapshot = catalog_snapshot.current(catalog_version)
+    if snapshot is not None:
+        books = snapshot.query(sort_by, 0, limit + 1, title, author, genre, year_from, year_to, after=after)
+    if books is None:
+        query = _filter_books(select(*LIST_COLUMNS), title, author, genre, year_from, year_to)
+        page = _after(query, sort_column, after, limit + 1).subquery()
+        result = await db.execute(_with_authors(page).order_by(page.c[sort_by], page.c.id))
+        books = [_row_dict(row) for row in result]
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        next_cursor = encode_cursor(sort_by, books[-1][sort_by], books[-1]["id"])
+    page = {"items": books, "next_cursor": next_cursor}
+    await cache.set(key, page)
+    return page
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def _estimated_rows(db: AsyncSession, query) -> int:
+    plan = (await db.execute(_Explain(query))).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+COUNT_MODES = ("exact", "estimate", "cached")
+
+
+async def count_books(db: AsyncSession, mode: str = "exact", title: Optional[str] = None, author: Optional[str] = None,
+                      genre: Optional[str] = None, year_from: Optional[int] = None,
+                      year_to: Optional[int] = None, catalog_version: Optional[int] = None) -> int:
+    """Books matching the listing filters.
+
+    ``exact`` runs ``COUNT(*)``; ``cached`` reuses it until the next catalog write; ``estimate`` reads
+    ``pg_class.reltuples`` without filters, or the planner's row estimate for the filtered query.
+    """
+    if mode not in COUNT_MODES:
+        raise ValueError(f"Unknown count mode '{mode}'")
+    matching = _filter_books(select(Book.id), title, author, genre, year_from, year_to)
+    if mode == "estimate":
+        if not any((title, author, genre, year_from, year_to)):
+            reltuples = (await db.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+                {"name": Book.__tablename__}
+            )).scalar_one()
+            # -1 until the table was first vacuumed or analyzed.
+            if reltuples >= 0:
+                return int(reltuples)
+        return await _estimated_rows(db, matching)
+    key = None
+    if mode == "cached":
+        key = await query_key("books-count", await _catalog_version(db, catalog_version),
+                              **_filter_params(title, author, genre, year_from, year_to))
+        cached = await cache.get(key)
+        if cached is not None:
+            return cached
+    total = (await db.execute(select(func.count()).select_from(matching.subquery()))).scalar_one()
+    if key is not None:
+        await cache.set(key, total)
+    return total
+
+
+async def stream_books(db: AsyncSession, partition_size: int = EXPORT_PARTITION_SIZE, title: Optional[str] = None,
+                       author: Optional[str] = None, genre: Optional[str] = None, year_from: Optional[int] = None,
+                       year_to: Optional[int] = None) -> AsyncIterator[List[dict]]:
+    """Yield every matching book, ``partition_size`` rows at a time, from a server-side cursor."""
+    books = _filter_books(select(*LIST_COLUMNS), title, author, genre, year_from, year_to).subquery()
+    query = _with_authors(books).order_by(books.c.id).execution_options(yield_per=partition_size)
+    result = await db.stream(query)
+    async for partition in result.partitions():
+        yield [_row_dict(row) for row in partition]
 
 
 async def get_book(db: AsyncSession, book_id: str):
@@ -64,67 +308,299 @@ async def get_book(db: AsyncSession, book_id: str):
     return result.unique().scalar_one_or_none()
 
 
-async def update_book(db: AsyncSession, book_id: str, book_update: BookUpdate):
-    db_book = await get_book(db, book_id)
-    if not db_book:
+async def get_book_version(db: AsyncSession, book_id: str) -> Optional[int]:
+    return (await db.execute(select(Book.version).where(Book.id == book_id))).scalar_one_or_none()
+
+
+async def get_catalog_version(db: AsyncSession) -> int:
+    return (await db.execute(CATALOG_VERSION)).scalar_one()
+
+
+async def get_book_data(db: AsyncSession, book_id: str, version: Optional[int] = None) -> Optional[dict]:
+    """Single-book payload; with the ``books.version`` the caller has read, an entry at another version is reloaded."""
+    key = book_key(book_id)
+    cached = await cache.get(key)
+    if cached is not None and (version is None or cached["version"] == version):
+        return cached
+    generation = await cache.get_counter(GENERATION_KEY)
+    book = await get_book(db, book_id)
+    if not book:
         return None
+    data = _book_data(book)
+    # Skip the fill if a write landed while we were reading, or we could cache a stale row. A reader
+    # of a lagging replica must not replace a newer entry either.
+    if await cache.get_counter(GENERATION_KEY) == generation and (cached is None
+                                                                  or cached["version"] <= data["version"]):
+        await cache.set(key, data)
+    return data
+
+
+async def get_books_by_ids(db: AsyncSession, book_ids: List[uuid.UUID]) -> Tuple[List[dict], List[uuid.UUID]]:
+    """Return ``(books, missing_ids)`` in request order; cache misses are loaded with one IN query plus authors."""
+    book_ids = list(dict.fromkeys(book_ids))
+    # Keyed by str(id): a serializing cache backend hands ids back as strings, not UUIDs.
+    found = {str(data["id"]): data
+             for data in (await cache.get_many([book_key(book_id) for book_id in book_ids])).values()}
+    misses = [book_id for book_id in book_ids if str(book_id) not in found]
+    if misses:
+        generation = await cache.get_counter(GENERATION_KEY)
+        result = await db.execute(select(Book).options(selectinload(Book.authors)).where(Book.id.in_(misses)))
+        loaded = {book.id: _book_data(book) for book in result.scalars().all()}
+        found.update((str(book_id), data) for book_id, data in loaded.items())
+        if loaded and await cache.get_counter(GENERATION_KEY) == generation:
+            await cache.set_many({book_key(book_id): data for book_id, data in loaded.items()})
+    books = [found[str(book_id)] for book_id in book_ids if str(book_id) in found]
+    missing = [book_id for book_id in book_ids if str(book_id) not in found]
+    return books, missing
+
+
+async def _delete_orphaned_authors(db: AsyncSession, author_ids: List[uuid.UUID]):
+    if author_ids:
+        deleted = await db.execute(delete(Author).where(
+            Author.id.in_(author_ids),
+            ~select(book_authors.c.author_id).where(book_authors.c.author_id == Author.id).exists()
+        ).returning(Author.name))
+        author_resolver.forget(deleted.scalars().all())
+
+
+async def update_book(db: AsyncSession, book_id: str, book_update: BookUpdate):
+    # At most four statements whatever the number of authors: row update, removed-link delete,
+    # new-link insert and orphan cleanup. Author names resolve through the shared resolver.
     update_data = book_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        if key == "author_names":
-            await db.execute(delete(book_authors).where(book_authors.c.book_id == book_id))
-            for name in value:
-                author = (await db.execute(select(Author).filter_by(name=name))).scalar_one_or_none()
-                if not author:
-                    author = Author(name=name)
-                    db.add(author)
-                    await db.flush()
-                await db.execute(book_authors.insert().values(book_id=book_id, author_id=author.id))
-        else:
-            setattr(db_book, key, value)
-    await db.commit()
-    result = await db.execute(select(Book).options(joinedload(Book.authors)).filter_by(id=book_id))
-    return result.unique().scalar_one()
+    author_names = update_data.pop("author_names", None)
+    for attempt in range(2):
+        # Resolved before the UPDATE, as in create_book: the resolver inserts new authors in a
+        # session of its own, which must never wait on locks this transaction holds.
+        author_ids = await author_resolver.resolve(author_names) if author_names is not None else None
+        result = await db.execute(
+            update(Book).where(Book.id == book_id).values(**update_data, version=Book.version + 1).returning(Book.id)
+        )
+        if result.scalar_one_or_none() is None:
+            if author_ids:
+                # Drop authors the resolver may have created just for this missing book.
+                await _delete_orphaned_authors(db, list(author_ids.values()))
+                await db.commit()
+            else:
+                await db.rollback()
+            return None
+        if author_names is None:
+            await db.commit()
+            break
+        try:
+            wanted = [author_ids[name] for name in dict.fromkeys(author_names)]
+            removed = await db.execute(
+                delete(book_authors)
+                .where(book_authors.c.book_id == book_id, book_authors.c.author_id.not_in(wanted))
+                .returning(book_authors.c.author_id)
+            )
+            removed_ids = removed.scalars().all()
+            await db.execute(
+                pg_insert(book_authors)
+                .values([{"book_id": book_id, "author_id": author_id} for author_id in wanted])
+                .on_conflict_do_nothing()
+            )
+            await _delete_orphaned_authors(db, removed_ids)
+            await db.commit()
+            break
+        except IntegrityError:
+            await db.rollback()
+            author_resolver.forget(author_names)
+            if attempt:
+                raise
+    await invalidate_books([book_id])
+    return await get_book(db, book_id)
 
 
 async def delete_book(db: AsyncSession, book_id: str):
-    associated_authors_query = select(book_authors.c.author_id).where(book_authors.c.book_id == book_id)
-    associated_authors_result = await db.execute(associated_authors_query)
-    associated_authors = [row[0] for row in associated_authors_result.fetchall()]
-
-    await db.execute(delete(book_authors).where(book_authors.c.book_id == book_id))
-    result = await db.execute(delete(Book).where(Book.id == book_id))
-    deleted_count = result.rowcount
-
-    for author_id in associated_authors:
-        remaining_books_query = select(func.count()).select_from(book_authors).where(
-            book_authors.c.author_id == author_id)
-        remaining_books_result = await db.execute(remaining_books_query)
-        remaining_books = remaining_books_result.scalar()
-        if remaining_books == 0:
-            await db.execute(delete(Author).where(Author.id == author_id))
+    removed = await db.execute(
+        delete(book_authors).where(book_authors.c.book_id == book_id).returning(book_authors.c.author_id)
+    )
+    author_ids = removed.scalars().all()
+    result = await db.execute(delete(Book).where(Book.id == book_id).returning(Book.id))
+    deleted = result.scalar_one_or_none() is not None
+    await _delete_orphaned_authors(db, author_ids)
 
     await db.commit()
-    return deleted_count > 0
+    if deleted:
+        await invalidate_books([book_id])
+    return deleted
+
 
+async def ingest_chunk(db: AsyncSession, books: List[BookCreate]) -> List[dict]:
+    """Insert and commit a chunk of books with set-based statements.
 
-async def bulk_upload_books(db: AsyncSession, books: List[BookCreate]):
-    created_books = []
+    Author names are resolved per chunk, so memory stays bounded by the chunk size however
+    many distinct authors a long upload or import brings.
+    """
+    author_ids, _ = await lookup_or_create_authors(db, (name for book in books for name in book.author_names))
+
+    rows, links, created = [], [], []
     for book in books:
-        created_book = await create_book(db, book)
-        created_books.append(created_book)
-    return created_books
+        book_id = uuid.uuid4()
+        names = list(dict.fromkeys(book.author_names))
+        rows.append({"id": book_id, "title": book.title, "published_year": book.published_year,
+                     "genres": book.genres})
+        links.extend({"book_id": book_id, "author_id": author_ids[name]} for name in names)
+        # Same key order as BookResponse, so the fast JSON path renders identical bytes.
+        created.append({
+            "title": book.title,
+            "published_year": book.published_year,
+            "genres": book.genres,
+            "id": book_id,
+            "authors": names
+        })
+    if rows:
+        # executemany rather than one multi-row VALUES, which would pass asyncpg's 32767 bind
+        # parameter limit for large chunks.
+        await db.execute(insert(Book), rows)
+        await db.execute(insert(book_authors), links)
+    await db.commit()
+    await invalidate_catalog()
+    return created
 
 
-async def search_books(db: AsyncSession, query: str):
-    search_query = select(Book).options(joinedload(Book.authors)).filter(
-        (Book.title.ilike(f"%{query}%")) | (Author.name.ilike(f"%{query}%"))
+async def bulk_upload_books(db: AsyncSession, books: List[BookCreate],
+                            chunk_size: int = BULK_UPLOAD_CHUNK_SIZE) -> BulkUploadResult:
+    result = BulkUploadResult()
+    for start in range(0, len(books), chunk_size):
+        chunk = books[start:start + chunk_size]
+        started = time.perf_counter()
+        created = await ingest_chunk(db, chunk)
+        stats = ChunkStats(
+            chunk=len(result.chunks),
+            books=len(created),
+            authors=len({name for book in created for name in book["authors"]}),
+            links=sum(len(book["authors"]) for book in created),
+            seconds=time.perf_counter() - started
+        )
+        logger.info("bulk upload chunk %d: %d books, %d author names, %d links in %.3fs",
+                    stats.chunk, stats.books, stats.authors, stats.links, stats.seconds)
+        result.books.extend(created)
+        result.chunks.append(stats)
+    return result
+
+
+async def search_books(db: AsyncSession, query: str, skip: int = 0, limit: int = 10,
+                       catalog_version: Optional[int] = None):
+    # Both ILIKE and pg_trgm similarity are case-insensitive, so the key is too.
+    key = await query_key("search", await _catalog_version(db, catalog_version), query=query.lower(), skip=skip,
+                          limit=limit)
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+    # Both branches are served by the pg_trgm GIN indexes; a book's score is its best
+    # title or author similarity to the search term.
+    pattern = _contains_pattern(query)
+    title_matches = select(Book.id.label("book_id"), func.similarity(Book.title, query).label("score")).where(
+        Book.title.ilike(pattern)
     )
-    result = await db.execute(search_query)
-    books = result.unique().scalars().all()
-    return [{
-        "id": book.id,
-        "title": book.title,
-        "published_year": book.published_year,
-        "genres": book.genres,
-        "authors": [author.name for author in book.authors]
-    } for book in books]
\ No newline at end of file
+    author_matches = select(book_authors.c.book_id, func.similarity(Author.name, query).label("score")).join(
+        Author, Author.id == book_authors.c.author_id
+    ).where(Author.name.ilike(pattern))
+    matches = union_all(title_matches, author_matches).subquery()
+    ranked = select(matches.c.book_id, func.max(matches.c.score).label("score")).group_by(matches.c.book_id).subquery()
+    page = (
+        select(*LIST_COLUMNS, ranked.c.score)
+        .join(ranked, ranked.c.book_id == Book.id)
+        .order_by(ranked.c.score.desc(), Book.title, Book.id)
+        .offset(skip)
+        .limit(limit)
+        .subquery()
+    )
+    result = await db.execute(_with_authors(page).order_by(page.c.score.desc(), page.c.title, page.c.id))
+    books = [_row_dict(row) for row in result]
+    await cache.set(key, books)
+    return books
+
+
+def _facets(genre_counts: Dict[int, int], decade_counts: Dict[int, int], authors) -> dict:
+    return {
+        "genres": {genre.value: genre_counts.get(code, 0) for genre, code in GENRE_CODES.items()},
+        "decades": {str(decade): count for decade, count in sorted(decade_counts.items())},
+        "authors": [{"name": name, "count": count} for name, count in authors],
+    }
+
+
+async def _precomputed_facets(db: AsyncSession, top_authors: int) -> dict:
+    # Counters are split into per-backend slots; a count is the sum of its slots.
+    total = cast(func.sum(FacetCount.count), BigInteger)
+    counts = await db.execute(
+        select(FacetCount.facet, FacetCount.value, total)
+        .where(FacetCount.facet.in_(["genre", "decade"]))
+        .group_by(FacetCount.facet, FacetCount.value)
+        .having(total > 0)
+    )
+    genre_counts, decade_counts = {}, {}
+    for facet, value, count in counts.all():
+        if facet == "genre":
+            genre_counts[int(value)] = count
+        else:
+            decade_counts[int(value)] = count
+    authors = await db.execute(
+        select(Author.name, total)
+        .join(Author, Author.id == cast(FacetCount.value, UUID))
+        .where(FacetCount.facet == "author")
+        .group_by(Author.id)
+        .having(total > 0)
+        .order_by(total.desc(), Author.name)
+        .limit(top_authors)
+    )
+    return _facets(genre_counts, decade_counts, authors.all())
+
+
+async def _filtered_facets(db: AsyncSession, top_authors: int, **filters) -> dict:
+    # One statement: the filtered books are read once into a CTE that all three aggregates share.
+    matching = _filter_books(select(Book.id, Book.genres, Book.published_year), **filters).cte("matching")
+    genres = select(func.unnest(matching.c.genres).label("code")).subquery()
+    genre_counts = (
+        select(literal_column("'genre'").label("facet"), cast(genres.c.code, String).label("value"),
+               func.count().label("count"), literal_column("0").label("position"))
+        .group_by(genres.c.code)
+    )
+    decade = matching.c.published_year // 10 * 10
+    decade_counts = (
+        select(literal_column("'decade'"), cast(decade, String), func.count(), literal_column("0"))
+        .where(matching.c.published_year.is_not(None))
+        .group_by(decade)
+    )
+    author_count = func.count()
+    top = (
+        select(Author.name, author_count.label("count"),
+               func.row_number().over(order_by=(author_count.desc(), Author.name)).label("position"))
+        .select_from(matching)
+        .join(book_authors, book_authors.c.book_id == matching.c.id)
+        .join(Author, Author.id == book_authors.c.author_id)
+        .group_by(Author.name)
+        .order_by(author_count.desc(), Author.name)
+        .limit(top_authors)
+        .subquery()
+    )
+    author_counts = select(literal_column("'author'"), top.c.name, top.c.count, top.c.position)
+    facets = union_all(genre_counts, decade_counts, author_counts).subquery()
+    rows = await db.execute(select(facets).order_by(facets.c.position))
+    counts = {"genre": {}, "decade": {}}
+    authors = []
+    for facet, value, count, _ in rows.all():
+        if facet == "author":
+            authors.append((value, count))
+        else:
+            counts[facet][int(value)] = count
+    return _facets(counts["genre"], counts["decade"], authors)
+
+
+async def get_facets(db: AsyncSession, title: Optional[str] = None, author: Optional[str] = None,
+                     genre: Optional[str] = None, year_from: Optional[int] = None, year_to: Optional[int] = None,
+                     top_authors: int = FACET_TOP_AUTHORS, catalog_version: Optional[int] = None) -> dict:
+    """Counts per genre, decade and top authors; unfiltered requests read the trigger-maintained facet_counts."""
+    key = await query_key("facets", await _catalog_version(db, catalog_version), top_authors=top_authors,
+                          **_filter_params(title, author, genre, year_from, year_to))
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+    filters = dict(title=title, author=author, genre=genre, year_from=year_from, year_to=year_to)
+    if any(filters.values()):
+        facets = await _filtered_facets(db, top_authors, **filters)
+    else:
+        facets = await _precomputed_facets(db, top_authors)
+    await cache.set(key, facets)
+    return facets
@@ -0,0 +1,529 @@
+import asyncio
+import logging
+import time
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import BigInteger, String, any_, bindparam, cast, delete, func, select, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.config import (CATALOG_CHANGES_RETENTION_SECONDS, CATALOG_SNAPSHOT_ENABLED, CATALOG_SNAPSHOT_MAX_CHANGES,
+                        CATALOG_SNAPSHOT_REFRESH_SECONDS, EXPORT_PARTITION_SIZE)
+from app.database import async_session, read_session
+from app.models.model_base import Author, Book, CatalogState, book_authors, catalog_changes, catalog_changes_lease
+from app.utils.enum import GENRE_CODES, Genre
+
+logger = logging.getLogger(__name__)
+
+NO_YEAR = 32767  # Sorts after every real year, like NULL in an ascending Postgres sort.
+CATALOG_VERSION = select(cast(func.sum(CatalogState.version), BigInteger))
+# Books whose change rows were committed after ``since`` was taken, i.e. are invisible to it.
+CHANGED_SINCE = text(
+    "xid >= pg_snapshot_xmin(CAST(:since AS text)::pg_snapshot)::text::bigint "
+    "AND NOT pg_visible_in_snapshot(xid::text::xid8, CAST(:since AS text)::pg_snapshot)"
+)
+# Transactions from this id on start after the snapshot is taken.
+SNAPSHOT_XMAX = text("SELECT pg_snapshot_xmax(pg_current_snapshot())::text::bigint")
+
+
+class _Unanswerable(Exception):
+    pass
+
+
+def _fold(value: str) -> Optional[str]:
+    # Python and Postgres may case-fold non-ASCII text differently for ILIKE; such values are not
+    # matched in Python at all (None), so a filter that reaches one falls back to SQL.
+    return value.lower() if value.isascii() else None
+
+
+def _and_masks(masks: List[bytes]) -> bytes:
+    # One 0/1 byte per book, so a bytewise AND of whole masks is an AND of big integers.
+    combined = int.from_bytes(masks[0], "big")
+    for mask in masks[1:]:
+        combined &= int.from_bytes(mask, "big")
+    return combined.to_bytes(len(masks[0]), "big")
+
+
+class CatalogColumns:
+    """Immutable column store of the catalog at one catalog version.
+
+    Book positions follow Postgres' ``ORDER BY title, id``, so the title order is the identity and
+    needs no Python collation; ``year_order`` maps ranks in ``ORDER BY published_year, id`` to
+    positions. Each genre has a 0/1 byte mask in both orders. ``snapshot`` is the Postgres snapshot
+    the rows were read in, which the next refresh asks for changes since.
+    """
+
+    def __init__(self, version: int, snapshot: Optional[str] = None):
+        self.version = version
+        self.snapshot = snapshot
+        self.loaded_at = time.monotonic()
+        self.ids = bytearray()
+        self.titles: List[str] = []
+        self.titles_lower: List[Optional[str]] = []
+        self.years = array("h")
+        self.genres: List[Tuple[str, ...]] = []
+        self.authors: List[List[int]] = []
+        self.positions: Dict[uuid.UUID, int] = {}
+        self.author_names: List[str] = []
+        self.author_names_lower: List[Optional[str]] = []
+        self.author_index: Dict[uuid.UUID, int] = {}
+        self.author_books: List[array] = []
+        self.year_order = array("i")
+        self.year_rank = array("i")
+        self.years_by_rank = array("h")
+        self.title_masks: Dict[int, bytes] = {}
+        self.year_masks: Dict[int, bytes] = {}
+
+    def _add_author(self, author_id: uuid.UUID, name: str):
+        self.author_index[author_id] = len(self.author_names)
+        self.author_names.append(name)
+        self.author_names_lower.append(_fold(name))
+
+    def _add_book(self, book_id: uuid.UUID, title: str, title_lower: Optional[str], year: int, genres: Tuple[str, ...],
+                  authors: List[int]):
+        # Books are added in title order; ``year`` is already NO_YEAR for a NULL year.
+        self.positions[book_id] = len(self.titles)
+        self.ids += book_id.bytes
+        self.titles.append(title)
+        self.titles_lower.append(title_lower)
+        self.years.append(year)
+        self.genres.append(genres)
+        self.authors.append(authors)
+
+    def _year_key(self, position: int) -> Tuple[int, bytes]:
+        # uuid ordering in Postgres is a bytewise comparison, as it is for bytes.
+        return self.years[position], bytes(self.ids[position * 16:position * 16 + 16])
+
+    async def _index(self, partition_size: int):
+        # Derives the author, year and genre lookups from the rows and ``year_order``.
+        self.author_books = [array("i") for _ in self.author_names]
+        for position, authors in enumerate(self.authors):
+            for author in authors:
+                self.author_books[author].append(position)
+            if position % partition_size == 0:
+                await asyncio.sleep(0)
+        self.year_rank = array("i", bytes(4 * len(self)))
+        self.years_by_rank = array("h")
+        for rank, position in enumerate(self.year_order):
+            self.year_rank[position] = rank
+            self.years_by_rank.append(self.years[position])
+
+        codes: Dict[Tuple[str, ...], Tuple[int, ...]] = {}
+        title_masks = {code: bytearray(len(self)) for code in GENRE_CODES.values()}
+        year_masks = {code: bytearray(len(self)) for code in GENRE_CODES.values()}
+        for position, genres in enumerate(self.genres):
+            genre_codes = codes.get(genres)
+            if genre_codes is None:
+                genre_codes = codes[genres] = tuple(GENRE_CODES[Genre(name)] for name in genres)
+            rank = self.year_rank[position]
+            for code in genre_codes:
+                title_masks[code][position] = 1
+                year_masks[code][rank] = 1
+            if position % partition_size == 0:
+                await asyncio.sleep(0)
+        self.title_masks = {code: bytes(mask) for code, mask in title_masks.items()}
+        self.year_masks = {code: bytes(mask) for code, mask in year_masks.items()}
+
+    def __len__(self):
+        return len(self.titles)
+
+    def _row(self, position: int) -> dict:
+        year = self.years[position]
+        return {
+            "id": uuid.UUID(bytes=bytes(self.ids[position * 16:position * 16 + 16])),
+            "title": self.titles[position],
+            "published_year": None if year == NO_YEAR else year,
+            "genres": list(self.genres[position]),
+            "authors": [self.author_names[author] for author in self.authors[position]],
+        }
+
+    def query(self, sort_by: str, skip: int, limit: int, title: Optional[str] = None, author: Optional[str] = None,
+              genre: Optional[str] = None, year_from: Optional[int] = None, year_to: Optional[int] = None,
+              after: Optional[Tuple[Any, uuid.UUID]] = None) -> Optional[List[dict]]:
+        """Rows of ``get_books`` semantics, or None if the snapshot cannot answer (e.g. unknown cursor)."""
+        if any(term and not term.isascii() for term in (title, author)):
+            # Python and Postgres may case-fold non-ASCII text differently for ILIKE.
+            return None
+        by_title = sort_by == "title"
+        masks = self.title_masks if by_title else self.year_masks
+        mask = None
+        if genre:
+            names = genre.split(",")
+            if any(name not in Genre._value2member_map_ for name in names):
+                return []
+            mask = _and_masks([masks[GENRE_CODES[Genre(name)]] for name in dict.fromkeys(names)])
+
+        start, end = 0, len(self)
+        year_from, year_to = year_from or None, year_to or None
+        check_year = by_title and (year_from or year_to)
+        if not by_title and (year_from or year_to):
+            start = bisect_left(self.years_by_rank, year_from) if year_from else 0
+            end = bisect_right(self.years_by_rank, year_to) if year_to else bisect_left(self.years_by_rank, NO_YEAR)
+        if after is not None:
+            last_value, last_id = after
+            position = self.positions.get(last_id)
+            if position is None:
+                return None
+            current = self.titles[position] if by_title else self.years[position]
+            if current != (NO_YEAR if not by_title and last_value is None else last_value):
+                return None
+            start = max(start, (position if by_title else self.year_rank[position]) + 1)
+
+        term = title.lower() if title else None
+
+        def matches(position: int) -> bool:
+            if term is not None:
+                title_lower = self.titles_lower[position]
+                if title_lower is None:
+                    raise _Unanswerable
+                if term not in title_lower:
+                    return False
+            if check_year:
+                year = self.years[position]
+                if year == NO_YEAR or (year_from and year < year_from) or (year_to and year > year_to):
+                    return False
+            return True
+
+        try:
+            if author:
+                # Author matches are usually few: test their books and order them by rank.
+                needle = author.lower()
+                candidates = set()
+                for index, name in enumerate(self.author_names_lower):
+                    if name is None:
+                        raise _Unanswerable
+                    if needle in name:
+                        candidates.update(self.author_books[index])
+                ranked = []
+                for position in candidates:
+                    rank = position if by_title else self.year_rank[position]
+                    if start <= rank < end and (mask is None or mask[rank]) and matches(position):
+                        ranked.append(rank)
+                ranked.sort()
+                order = ranked[skip:skip + limit]
+            elif mask is None and term is None and not check_year:
+                order = range(min(end, start + skip), min(end, start + skip + limit))
+            else:
+                order, skipped, rank = [], 0, start
+                while rank < end and len(order) < limit:
+                    if mask is not None:
+                        rank = mask.find(1, rank, end)
+                        if rank < 0:
+                            break
+                    position = rank if by_title else self.year_order[rank]
+                    if matches(position):
+                        if skipped < skip:
+                            skipped += 1
+                        else:
+                            order.append(rank)
+                    rank += 1
+        except _Unanswerable:
+            return None
+        return [self._row(rank if by_title else self.year_order[rank]) for rank in order]
+
+
+async def _begin_snapshot(db: AsyncSession) -> Tuple[int, str]:
+    # First statement of one REPEATABLE READ transaction: every later read matches this version.
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    version, snapshot = (await db.execute(
+        select(CATALOG_VERSION.scalar_subquery(), cast(func.pg_current_snapshot(), String))
+    )).one()
+    return version, snapshot
+
+
+async def _load_columns(db: AsyncSession, partition_size: int) -> CatalogColumns:
+    columns = CatalogColumns(*await _begin_snapshot(db))
+
+    authors = await db.stream(select(Author.id, Author.name).execution_options(yield_per=partition_size))
+    async for partition in authors.partitions():
+        for author_id, name in partition:
+            columns._add_author(author_id, name)
+
+    interned: Dict[tuple, Tuple[str, ...]] = {}
+    books = await db.stream(
+        select(Book.id, Book.title, Book.published_year, Book.genres)
+        .order_by(Book.title, Book.id)
+        .execution_options(yield_per=partition_size)
+    )
+    async for partition in books.partitions():
+        for book_id, title, year, genres in partition:
+            genres = interned.setdefault(tuple(genres), tuple(genres))
+            columns._add_book(book_id, title, _fold(title), NO_YEAR if year is None else year, genres, [])
+
+    links = await db.stream(
+        select(book_authors.c.book_id, book_authors.c.author_id).execution_options(yield_per=partition_size)
+    )
+    async for partition in links.partitions():
+        for book_id, author_id in partition:
+            columns.authors[columns.positions[book_id]].append(columns.author_index[author_id])
+
+    ordered = await db.stream(
+        select(Book.id).order_by(Book.published_year, Book.id).execution_options(yield_per=partition_size)
+    )
+    async for partition in ordered.partitions():
+        for (book_id,) in partition:
+            columns.year_order.append(columns.positions[book_id])
+    await db.commit()
+
+    await columns._index(partition_size)
+    return columns
+
+
+async def _renew_change_log(db: AsyncSession, retention_seconds: float) -> int:
+    """Keeps the ``catalog_changes`` triggers writing for ``retention_seconds`` more.
+
+    Returns a transaction id from which on every writer sees the lease, so logs its changes.
+    """
+    lease = pg_insert(catalog_changes_lease).values(
+        id=1, active_until=func.now() + timedelta(seconds=retention_seconds)
+    )
+    await db.execute(lease.on_conflict_do_update(
+        index_elements=[catalog_changes_lease.c.id],
+        set_={"active_until": func.greatest(catalog_changes_lease.c.active_until, lease.excluded.active_until)},
+    ))
+    await db.commit()
+    logged_from = (await db.execute(SNAPSHOT_XMAX)).scalar_one()
+    await db.commit()
+    return logged_from
+
+
+async def _load_changes(db: AsyncSession, old: CatalogColumns, max_changes: int,
+                        partition_size: int) -> Optional[CatalogColumns]:
+    """``old`` brought up to date by re-reading only the books changed since it was loaded.
+
+    None if more than ``max_changes`` books changed, where a full load is cheaper.
+    """
+    version, snapshot = await _begin_snapshot(db)
+    if version == old.version:
+        await db.commit()
+        # Nothing was committed in between, so the rows are as current as the new snapshot.
+        old.snapshot, old.loaded_at = snapshot, time.monotonic()
+        return old
+    changed = (await db.execute(
+        select(catalog_changes.c.book_id).distinct().where(CHANGED_SINCE).limit(max_changes + 1),
+        {"since": old.snapshot},
+    )).scalars().all()
+    if len(changed) > max_changes:
+        await db.commit()
+        return None
+
+    # Each changed book comes with the book after it in ``ORDER BY title, id``, so it can be placed
+    # among the unchanged ones without comparing titles in Python.
+    following = aliased(Book)
+    next_id = (
+        select(following.id)
+        .where(tuple_(following.title, following.id) > tuple_(Book.title, Book.id))
+        .order_by(following.title, following.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    author_ids = select(func.array_agg(book_authors.c.author_id)).where(book_authors.c.book_id == Book.id)
+    rows = (await db.execute(
+        select(Book.id, Book.title, Book.published_year, Book.genres, author_ids.scalar_subquery(), next_id)
+        .where(Book.id == any_(bindparam("changed", list(changed), type_=ARRAY(Book.id.type))))
+        .order_by(Book.title, Book.id)
+    )).all()
+    unknown = {author_id for row in rows for author_id in row[4] or () if author_id not in old.author_index}
+    authors = []
+    if unknown:
+        authors = (await db.execute(
+            select(Author.id, Author.name)
+            .where(Author.id == any_(bindparam("unknown", list(unknown), type_=ARRAY(Author.id.type))))
+        )).all()
+    await db.commit()
+    return await _apply_changes(old, version, snapshot, set(changed), rows, authors, partition_size)
+
+
+async def _apply_changes(old: CatalogColumns, version: int, snapshot: str, changed: Set[uuid.UUID],
+                         rows: Sequence[tuple], authors: Sequence[tuple],
+                         partition_size: int) -> Optional[CatalogColumns]:
+    """``old`` with the ``changed`` books replaced by ``rows``, the ones that still exist.
+
+    ``rows`` are ``(id, title, published_year, genres, author ids, next id)`` in ``ORDER BY title, id``
+    and ``authors`` the ``(id, name)`` of their authors ``old`` does not know. None if the rows do not
+    fit ``old``, e.g. a next id ``old`` has never seen.
+    """
+    columns = CatalogColumns(version, snapshot)
+    # Names of authors whose last book went away stay behind; they match no position.
+    columns.author_names = list(old.author_names)
+    columns.author_names_lower = list(old.author_names_lower)
+    columns.author_index = dict(old.author_index)
+    for author_id, name in authors:
+        columns._add_author(author_id, name)
+
+    # A changed book goes right before the first unchanged book that follows it, or at the end.
+    inserts: Dict[Optional[uuid.UUID], List[tuple]] = {}
+    anchor = None
+    for row in reversed(rows):
+        if row[5] not in changed:
+            anchor = row[5]
+        inserts.setdefault(anchor, []).append(row)
+    added = []
+
+    def insert(anchor_id: Optional[uuid.UUID]):
+        for book_id, title, year, genres, author_ids, _ in reversed(inserts.pop(anchor_id, ())):
+            added.append(len(columns))
+            columns._add_book(book_id, title, _fold(title), NO_YEAR if year is None else year, tuple(genres),
+                              [columns.author_index[author_id] for author_id in author_ids or ()])
+
+    try:
+        remap = array("i", [-1]) * len(old)
+        for book_id, position in old.positions.items():
+            insert(book_id)
+            if book_id not in changed:
+                remap[position] = len(columns)
+                columns._add_book(book_id, old.titles[position], old.titles_lower[position], old.years[position],
+                                  old.genres[position], old.authors[position])
+            if position % partition_size == 0:
+                await asyncio.sleep(0)
+        insert(None)
+    except KeyError:
+        return None
+    if inserts:
+        return None
+
+    # Unchanged books keep their relative year order; the changed ones are merged in.
+    added.sort(key=columns._year_key)
+    merged = 0
+    for position in old.year_order:
+        position = remap[position]
+        if position < 0:
+            continue
+        if merged < len(added):
+            key = columns._year_key(position)
+            while merged < len(added) and columns._year_key(added[merged]) < key:
+                columns.year_order.append(added[merged])
+                merged += 1
+        columns.year_order.append(position)
+    columns.year_order.extend(added[merged:])
+
+    await columns._index(partition_size)
+    return columns
+
+
+class CatalogSnapshot:
+    """Serves listing queries from a ``CatalogColumns`` while it matches the database catalog version.
+
+    Any write bumps the version; until a background refresh catches up, callers fall back to SQL. A
+    refresh re-reads only the books the ``catalog_changes`` log names since the last load, and reloads
+    everything when too many changed or the log may have missed or pruned changes since that load.
+    The log is written only while a snapshot-enabled process renews its lease (``start_change_log``).
+    """
+
+    def __init__(self, enabled: bool = CATALOG_SNAPSHOT_ENABLED, session_factory=read_session,
+                 refresh_seconds: float = CATALOG_SNAPSHOT_REFRESH_SECONDS, partition_size: int = EXPORT_PARTITION_SIZE,
+                 max_changes: int = CATALOG_SNAPSHOT_MAX_CHANGES,
+                 retention_seconds: float = CATALOG_CHANGES_RETENTION_SECONDS, write_session_factory=async_session):
+        self.enabled = enabled
+        self.session_factory = session_factory
+        self.write_session_factory = write_session_factory
+        self.refresh_seconds = refresh_seconds
+        self.partition_size = partition_size
+        self.max_changes = max_changes
+        self.retention_seconds = retention_seconds
+        self.columns: Optional[CatalogColumns] = None
+        self._loading: Optional[asyncio.Task] = None
+        self._maintaining: Optional[asyncio.Task] = None
+        self._logged_from: Optional[int] = None
+        self._renewed_at = float("-inf")
+        self._last_load = float("-inf")
+        self.load_seconds = None
+        self.hits = self.fallbacks = self.loads = self.delta_loads = 0
+
+    def current(self, version: int) -> Optional[CatalogColumns]:
+        """The columns if they are at ``version``, the catalog version the caller has already read."""
+        if not self.enabled:
+            return None
+        columns = self.columns
+        if columns is not None and columns.version == version:
+            self.hits += 1
+            return columns
+        self.fallbacks += 1
+        self.refresh()
+        return None
+
+    def refresh(self):
+        if self._loading is None and time.monotonic() - self._last_load >= self.refresh_seconds:
+            self._last_load = time.monotonic()
+            self._loading = asyncio.create_task(self._load())
+
+    async def _load(self):
+        started = time.perf_counter()
+        try:
+            columns = self.columns
+            async with self.session_factory() as db:
+                refreshed = None
+                if self._can_catch_up(columns):
+                    refreshed = await _load_changes(db, columns, self.max_changes, self.partition_size)
+                if refreshed is None:
+                    refreshed = await _load_columns(db, self.partition_size)
+                    self.loads += 1
+                else:
+                    self.delta_loads += 1
+            self.columns = refreshed
+            self.load_seconds = time.perf_counter() - started
+            logger.info("catalog snapshot loaded: %d books at version %d in %.1fs",
+                        len(refreshed), refreshed.version, self.load_seconds)
+        except Exception:
+            logger.exception("catalog snapshot load failed")
+        finally:
+            self._loading = None
+
+    def _can_catch_up(self, columns: Optional[CatalogColumns]) -> bool:
+        if columns is None or self._logged_from is None:
+            return False
+        now = time.monotonic()
+        # Change rows older than the retention may be pruned, and without a recent renewal the lease
+        # may have run out. Transactions still running when the log started may not be in it.
+        return (now - columns.loaded_at < self.retention_seconds / 2
+                and now - self._renewed_at < self.retention_seconds / 2
+                and int(columns.snapshot.split(":")[0]) >= self._logged_from)
+
+    def start_change_log(self):
+        """Keeps the change log written and pruned while this process runs."""
+        if self._maintaining is None:
+            self._maintaining = asyncio.create_task(self._maintain())
+
+    async def stop_change_log(self):
+        if self._maintaining is not None:
+            self._maintaining.cancel()
+            await asyncio.gather(self._maintaining, return_exceptions=True)
+            self._maintaining = None
+
+    async def _maintain(self):
+        while True:
+            try:
+                async with self.write_session_factory() as db:
+                    logged_from = await _renew_change_log(db, self.retention_seconds)
+                    if time.monotonic() - self._renewed_at >= self.retention_seconds / 2:
+                        # The lease may have lapsed since the last renewal: the log is complete only from now.
+                        self._logged_from = logged_from
+                    self._renewed_at = time.monotonic()
+                    await db.execute(delete(catalog_changes).where(
+                        catalog_changes.c.changed_at < func.now() - timedelta(seconds=self.retention_seconds)
+                    ))
+                    await db.commit()
+            except Exception:
+                logger.exception("maintaining the catalog change log failed")
+            await asyncio.sleep(self.retention_seconds / 4)
+
+    def stats(self) -> dict:
+        columns = self.columns
+        return {
+            "enabled": self.enabled,
+            "books": len(columns) if columns else None,
+            "authors": len(columns.author_names) if columns else None,
+            "version": columns.version if columns else None,
+            "loading": self._loading is not None,
+            "loads": self.loads,
+            "delta_loads": self.delta_loads,
+            "load_seconds": self.load_seconds,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+        }
+
+
+catalog_snapshot = CatalogSnapshot()
@@ -0,0 +1,125 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import (DATABASE_URL, DATABASE_REPLICA_URL, DB_ECHO, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+                        DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_CACHE_SIZE)
+from app.utils.metrics import Counter, Gauge, Histogram
+from app.utils.profiling import record_statement
+
+
+class DatabaseMetrics:
+    def __init__(self):
+        self.statements = Counter()
+        self.statement_errors = Counter()
+        self.statement_seconds = Histogram()
+        self.checkout_wait_seconds = Histogram()
+        self.checked_out = Gauge()
+        self.connections_opened = Counter()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    # Times how long a request waits for a connection, which no pool event reports.
+    metrics: DatabaseMetrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.checkout_wait_seconds.observe(time.perf_counter() - started)
+
+
+def _database_url(url: str):
+    # asyncpg prepared statements are cached per connection by the SQLAlchemy dialect;
+    # 0 disables the cache (required behind pgbouncer in transaction mode).
+    return make_url(url).update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+
+
+def instrument(engine, metrics: DatabaseMetrics):
+    sync_engine = engine.sync_engine
+    sync_engine.pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        metrics.statements.inc()
+        metrics.statement_seconds.observe(elapsed)
+        record_statement(elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+        metrics.statement_errors.inc()
+
+    @event.listens_for(sync_engine.pool, "connect")
+    def connect(dbapi_connection, connection_record):
+        metrics.connections_opened.inc()
+
+    @event.listens_for(sync_engine.pool, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checked_out.inc()
+
+    @event.listens_for(sync_engine.pool, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        metrics.checked_out.dec()
+
+
+def create_engine(url: str = DATABASE_URL):
+    return create_async_engine(
+        _database_url(url),
+        echo=DB_ECHO,
+        poolclass=InstrumentedPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+metrics = DatabaseMetrics()
+engine = create_engine()
+instrument(engine, metrics)
+async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+
+# Reads run in READ ONLY transactions on the replica, or on the primary's pool without one.
+replica_metrics = DatabaseMetrics() if DATABASE_REPLICA_URL else metrics
+replica_engine = create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else engine
+if DATABASE_REPLICA_URL:
+    instrument(replica_engine, replica_metrics)
+read_session = async_sessionmaker(replica_engine.execution_options(postgresql_readonly=True),
+                                  expire_on_commit=False, class_=AsyncSession)
+
+
+def _engine_stats(engine, metrics: DatabaseMetrics) -> dict:
+    pool = engine.sync_engine.pool
+    return {
+        "pool": {
+            "size": pool.size(),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        },
+        "connections_opened": metrics.connections_opened.value,
+        "statements": metrics.statements.value,
+        "statement_errors": metrics.statement_errors.value,
+        "statement_seconds": metrics.statement_seconds.snapshot(),
+        "checkout_wait_seconds": metrics.checkout_wait_seconds.snapshot(),
+    }
+
+
+def stats() -> dict:
+    result = _engine_stats(engine, metrics)
+    if DATABASE_REPLICA_URL:
+        result["replica"] = _engine_stats(replica_engine, replica_metrics)
+    return result
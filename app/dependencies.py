@@ -1,18 +1,25 @@
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from app.config import DATABASE_URL
+from app.database import async_session, read_session
 from app.utils.jwt import verify_token
+from app.utils.read_your_writes import mark_write, wrote_recently
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-
-engine = create_async_engine(DATABASE_URL, echo=True)
-async_session = async_sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 async def get_db():
     async with async_session() as session:
         yield session
 
+async def get_read_db(token: Optional[str] = Depends(optional_oauth2_scheme)):
+    # Replica session, unless the caller wrote within READ_YOUR_WRITES_SECONDS and the replica
+    # may not have caught up yet. Reads are public, so a bad token only loses the stickiness.
+    payload = verify_token(token) if token else None
+    session_factory = async_session if payload and wrote_recently(payload.get("sub")) else read_session
+    async with session_factory() as session:
+        yield session
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -22,4 +29,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     payload = verify_token(token)
     if not payload:
         raise credentials_exception
-    return payload
\ No newline at end of file
+    return payload
+
+async def get_write_db(user=Depends(get_current_user)):
+    try:
+        async with async_session() as session:
+            yield session
+    finally:
+        mark_write(user["sub"])
@@ -0,0 +1,206 @@
+import asyncio
+import json
+import logging
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import islice
+from typing import IO, Any, AsyncIterator, Dict, List, Optional
+from pydantic import ValidationError
+from app.config import (BULK_UPLOAD_CHUNK_SIZE, BULK_UPLOAD_JOB_WORKERS, BULK_UPLOAD_JOB_DB_CONCURRENCY,
+                        BULK_UPLOAD_JOB_MAX_ERRORS, BULK_UPLOAD_JOB_HISTORY, BULK_UPLOAD_JOB_MAX_QUEUED,
+                        BULK_UPLOAD_JOB_MAX_RECORDS)
+from app.crud.book import ingest_chunk
+from app.database import async_session
+from app.jobs.queue import create_job_queue
+from app.schemas.book import BookCreate
+from app.utils.read_your_writes import mark_write
+from app.utils.stream import iter_json_array, validation_message
+
+logger = logging.getLogger(__name__)
+
+
+class BulkUploadBusy(Exception):
+    pass
+
+
+class BulkUploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class BulkUploadJob:
+    owner: str
+    records: Optional[IO[bytes]]  # Temporary file with one JSON record per line, closed when the job ends
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"
+    total: int = 0
+    processed: int = 0
+    imported: int = 0
+    failed: int = 0
+    chunks: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    seconds: float = 0.0
+
+    def record_error(self, index: int, message: str):
+        self.failed += 1
+        if len(self.errors) < BULK_UPLOAD_JOB_MAX_ERRORS:
+            self.errors.append({"index": index, "error": message})
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "imported": self.imported,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "books_per_second": round(self.imported / self.seconds, 1) if self.seconds else None,
+            "seconds": round(self.seconds, 3),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+queue = create_job_queue()
+jobs: "OrderedDict[str, BulkUploadJob]" = OrderedDict()
+# Chunks of all jobs share these slots, so imports hold at most this many pooled connections and
+# interactive requests get a connection between any two chunks.
+_db_slots = asyncio.Semaphore(BULK_UPLOAD_JOB_DB_CONCURRENCY)
+_workers: List[asyncio.Task] = []
+
+
+def _forget_finished():
+    finished = [job_id for job_id, job in jobs.items() if job.finished_at is not None]
+    for job_id in finished[:max(0, len(jobs) - BULK_UPLOAD_JOB_HISTORY)]:
+        del jobs[job_id]
+
+
+def _queued_jobs() -> int:
+    return sum(1 for job in jobs.values() if job.status == "queued")
+
+
+def _pending_records() -> int:
+    return sum(job.total - job.processed for job in jobs.values() if job.finished_at is None)
+
+
+async def submit(body: AsyncIterator[bytes], owner: str, max_queued: int = BULK_UPLOAD_JOB_MAX_QUEUED,
+                 max_records: int = BULK_UPLOAD_JOB_MAX_RECORDS) -> BulkUploadJob:
+    """Spool a JSON array request body to a temporary file and queue it as a job.
+
+    Raises BulkUploadBusy while ``max_queued`` jobs wait or unfinished jobs hold ``max_records``
+    records, BulkUploadTooLarge for a body of more than ``max_records`` records and ValueError for
+    a body that is not a JSON array.
+    """
+    if _queued_jobs() >= max_queued or _pending_records() >= max_records:
+        raise BulkUploadBusy()
+    records = tempfile.TemporaryFile()
+    total = 0
+    try:
+        async for record in iter_json_array(body):
+            total += 1
+            if total > max_records:
+                raise BulkUploadTooLarge(max_records)
+            records.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+        # Other uploads may have been queued while this body was read.
+        if _queued_jobs() >= max_queued or _pending_records() + total > max_records:
+            raise BulkUploadBusy()
+        records.seek(0)
+    except BaseException:
+        records.close()
+        raise
+    job = BulkUploadJob(owner=owner, records=records, total=total)
+    _forget_finished()
+    jobs[job.id] = job
+    await queue.put(job.id)
+    return job
+
+
+def get_job(job_id: str, owner: str) -> Optional[BulkUploadJob]:
+    job = jobs.get(job_id)
+    return job if job is not None and job.owner == owner else None
+
+
+def _validated(job: BulkUploadJob, start: int, records: List[Any]) -> List[BookCreate]:
+    books = []
+    for index, record in enumerate(records, start):
+        if not isinstance(record, dict):
+            job.record_error(index, "Expected a JSON object")
+            continue
+        try:
+            books.append(BookCreate(**record))
+        except ValidationError as e:
+            job.record_error(index, validation_message(e))
+    return books
+
+
+async def run_job(job: BulkUploadJob, chunk_size: int = BULK_UPLOAD_CHUNK_SIZE):
+    job.status = "running"
+    job.started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    try:
+        for start in range(0, job.total, chunk_size):
+            records = [json.loads(line) for line in islice(job.records, chunk_size)]
+            books = _validated(job, start, records)
+            if books:
+                async with _db_slots:
+                    async with async_session() as db:
+                        job.imported += len(await ingest_chunk(db, books))
+                job.chunks += 1
+            job.processed = min(job.total, start + chunk_size)
+            job.seconds = time.perf_counter() - started
+        job.status = "succeeded"
+    except Exception as e:
+        logger.exception("bulk upload job %s failed", job.id)
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.seconds = time.perf_counter() - started
+        job.finished_at = datetime.now(timezone.utc)
+        job.records.close()
+        job.records = None
+        mark_write(job.owner)
+
+
+async def _worker():
+    while True:
+        job = jobs.get(await queue.get())
+        if job is not None:
+            await run_job(job)
+
+
+def start_workers(count: int = BULK_UPLOAD_JOB_WORKERS):
+    for _ in range(count):
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_workers():
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+def stats() -> dict:
+    return {
+        "workers": len(_workers),
+        "db_concurrency": BULK_UPLOAD_JOB_DB_CONCURRENCY,
+        "max_queued": BULK_UPLOAD_JOB_MAX_QUEUED,
+        "max_records": BULK_UPLOAD_JOB_MAX_RECORDS,
+        "pending_records": _pending_records(),
+        "queue": queue.stats(),
+        "jobs": {status: sum(1 for job in jobs.values() if job.status == status)
+                 for status in ("queued", "running", "succeeded", "failed")},
+    }
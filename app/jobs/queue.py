@@ -0,0 +1,41 @@
+import asyncio
+from typing import Any, Dict
+from app.config import JOB_QUEUE_BACKEND
+
+
+class JobQueue:
+    """Queue the bulk upload workers consume job ids from.
+
+    A shared backend (e.g. a Redis list) implements the same methods so several app
+    processes can feed one pool of workers; ``get`` blocks until a job is available.
+    """
+
+    async def put(self, job_id: str) -> None:
+        raise NotImplementedError
+
+    async def get(self) -> str:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class LocalJobQueue(JobQueue):
+    # In-process stand-in: queued jobs are lost when the process exits.
+    def __init__(self):
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+
+    async def put(self, job_id):
+        await self._queue.put(job_id)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def stats(self):
+        return {"backend": "local", "queued": self._queue.qsize()}
+
+
+def create_job_queue(backend: str = JOB_QUEUE_BACKEND) -> JobQueue:
+    if backend == "local":
+        return LocalJobQueue()
+    raise ValueError(f"Unknown job queue backend '{backend}'")
@@ -1,10 +1,59 @@
-from fastapi import FastAPI
-from app.routers import books, auth
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from app.config import (ADMISSION_CONTROL_ENABLED, AUTHOR_RESOLVE_CONCURRENCY, BULK_UPLOAD_JOB_DB_CONCURRENCY,
+                        BULK_UPLOAD_JOB_RETRY_AFTER, DATABASE_REPLICA_URL, DB_MAX_OVERFLOW, DB_POOL_SIZE,
+                        PASSWORD_HASH_RETRY_AFTER, PROFILING_ENABLED)
+from app.crud.snapshot import catalog_snapshot
+from app.jobs import bulk_upload
+from app.middleware.admission import AdmissionMiddleware, check_pool_budget
+from app.middleware.profiling import ProfilingMiddleware, metrics_endpoint
+from app.routers import books, auth, stats
+from app.utils.password import PasswordHasherBusy
+from app.utils.responses import JSONResponse
 
-app = FastAPI(title="Book Management System")
+def background_connections() -> int:
+    # Primary pool connections taken outside the admission gates: resolver flushes, bulk upload job chunks
+    # and, with the snapshot on, its change log loop and (without a replica) its loader.
+    connections = AUTHOR_RESOLVE_CONCURRENCY + BULK_UPLOAD_JOB_DB_CONCURRENCY
+    if catalog_snapshot.enabled:
+        connections += 1 if DATABASE_REPLICA_URL else 2
+    return connections
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if ADMISSION_CONTROL_ENABLED:
+        check_pool_budget(DB_POOL_SIZE + DB_MAX_OVERFLOW, background_connections())
+    bulk_upload.start_workers()
+    if catalog_snapshot.enabled:
+        catalog_snapshot.start_change_log()
+        catalog_snapshot.refresh()
+    yield
+    await catalog_snapshot.stop_change_log()
+    await bulk_upload.stop_workers()
+
+app = FastAPI(title="Book Management System", default_response_class=JSONResponse, lifespan=lifespan)
+
+# Added first so profiling, when enabled, wraps it and also times the requests it sheds.
+if ADMISSION_CONTROL_ENABLED:
+    app.add_middleware(AdmissionMiddleware)
+
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+    app.add_api_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 app.include_router(books.router, prefix="/api/v1/books", tags=["books"])
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
+app.include_router(stats.router, prefix="/stats", tags=["stats"])
+
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(status_code=503, content={"detail": "Authentication is busy, retry shortly"},
+                        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)})
+
+@app.exception_handler(bulk_upload.BulkUploadBusy)
+async def bulk_upload_busy_handler(request: Request, exc: bulk_upload.BulkUploadBusy):
+    return JSONResponse(status_code=503, content={"detail": "Bulk upload queue is full, retry later"},
+                        headers={"Retry-After": str(BULK_UPLOAD_JOB_RETRY_AFTER)})
 
 @app.get("/")
 async def root():
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+from starlette.responses import JSONResponse
+from app.config import ADMISSION_DEEP_OFFSET, ADMISSION_LIMITS, ADMISSION_POINT_RESERVE, ADMISSION_RETRY_AFTER
+
+BOOKS_PREFIX = "/api/v1/books"
+HEAVY_PATHS = ("/search", "/facets")
+BULK_PATHS = ("/bulk-upload", "/import", "/export")
+WRITE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+
+
+class AdmissionGate:
+    """Concurrency budget of one route class with a bounded, deadline-limited wait queue."""
+
+    def __init__(self, concurrency: int, max_queue: int, max_wait_ms: float):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait_ms / 1000
+        self._slots = asyncio.Semaphore(concurrency)
+        self.active = self.waiting = 0
+        self.admitted = self.queued = self.rejected_queue_full = self.rejected_timeout = 0
+        self.wait_seconds = self.max_wait_seconds = 0.0
+
+    async def acquire(self) -> bool:
+        if not self._slots.locked():
+            await self._slots.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                return False
+            self.waiting += 1
+            self.queued += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                return False
+            finally:
+                self.waiting -= 1
+                waited = time.perf_counter() - started
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "max_wait_ms": self.max_wait * 1000,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_wait_ms": round(self.wait_seconds / self.queued * 1000, 3) if self.queued else None,
+            "max_wait_ms_seen": round(self.max_wait_seconds * 1000, 3),
+        }
+
+
+def parse_limits(spec: str) -> Dict[str, AdmissionGate]:
+    # "point=16/64/250,list=5/32/1000": concurrency/queue length/max wait in ms per route class.
+    gates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, values = item.partition("=")
+        concurrency, max_queue, max_wait_ms = values.split("/")
+        gates[name.strip()] = AdmissionGate(int(concurrency), int(max_queue), float(max_wait_ms))
+    return gates
+
+
+gates = parse_limits(ADMISSION_LIMITS)
+
+
+def check_pool_budget(pool_capacity: int, background: int, gates: Dict[str, AdmissionGate] = gates,
+                      reserve: int = ADMISSION_POINT_RESERVE) -> int:
+    """Connections left to point reads while every other gate and ``background`` connections are in use.
+
+    Raises ValueError if that is below ``reserve``.
+    """
+    taken = background + sum(gate.concurrency for name, gate in gates.items() if name != "point")
+    headroom = pool_capacity - taken
+    if headroom < reserve:
+        raise ValueError(f"admission budgets and background work can take {taken} of {pool_capacity} pooled "
+                         f"connections, leaving {headroom} to point reads; ADMISSION_POINT_RESERVE is {reserve}")
+    return headroom
+
+
+def route_class(method: str, path: str, query_string: bytes, deep_offset: int = ADMISSION_DEEP_OFFSET) -> Optional[str]:
+    """Budget a request draws on; None for requests that are never limited (root, stats, metrics)."""
+    if path.startswith("/auth"):
+        return "write"
+    if not path.startswith(BOOKS_PREFIX):
+        return None
+    rest = path[len(BOOKS_PREFIX):]
+    if rest.startswith("/bulk-upload/jobs/") and method == "GET":
+        return "point"
+    if rest.startswith(BULK_PATHS):
+        return "bulk"
+    if rest.startswith(HEAVY_PATHS):
+        return "heavy"
+    if rest == "/batch":
+        return "point"
+    if method in WRITE_METHODS:
+        return "write"
+    if rest in ("", "/"):
+        skip = parse_qs(query_string.decode("latin-1")).get("skip", ["0"])[-1]
+        # An OFFSET scan reads every skipped row, so deep pages cost like a search.
+        return "heavy" if skip.isdigit() and int(skip) >= deep_offset else "list"
+    return "point"
+
+
+class AdmissionMiddleware:
+    """Gives each route class its own concurrency budget so slow requests cannot take every DB connection.
+
+    A request over its class' budget waits in that class' queue for at most the class' deadline;
+    a full queue or an expired deadline answers ``503`` with ``Retry-After`` right away. The slot
+    is held until the response body has been sent, streaming exports and imports included. Only
+    requests are counted: author resolver flushes, bulk upload job chunks and the catalog snapshot
+    check out connections of their own, each with a fixed limit; ``check_pool_budget`` verifies at
+    startup that the budgets and those limits leave point reads their reserve of the pool.
+    """
+
+    def __init__(self, app, gates: Dict[str, AdmissionGate] = gates, retry_after: int = ADMISSION_RETRY_AFTER):
+        self.app = app
+        self.gates = gates
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        gate = self.gates.get(route_class(scope["method"], scope["path"], scope.get("query_string", b"")))
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+        if not await gate.acquire():
+            response = JSONResponse(status_code=503, content={"detail": "Server is busy, retry shortly"},
+                                    headers={"Retry-After": str(self.retry_after)})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
+
+
+def stats() -> dict:
+    return {name: gate.stats() for name, gate in gates.items()}
@@ -0,0 +1,126 @@
+import cProfile
+import logging
+import random
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from app.config import PROFILING_SAMPLE_RATE, PROFILING_SLOW_REQUEST_MS, PROFILING_OUTPUT_DIR
+from app.utils.metrics import Histogram, render_histogram
+from app.utils.profiling import RequestProfile, current_profile
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.duration_seconds = Histogram()
+        self.db_seconds = Histogram()
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.serialization_seconds = Histogram()
+        self.password_hash_seconds = Histogram()
+
+    def observe(self, seconds: float, profile: RequestProfile):
+        self.duration_seconds.observe(seconds)
+        self.db_seconds.observe(profile.db_seconds)
+        self.statements.observe(profile.statements)
+        self.serialization_seconds.observe(profile.serialization_seconds)
+        self.password_hash_seconds.observe(profile.password_hash_seconds)
+
+
+routes: Dict[tuple, RouteMetrics] = {}
+
+
+def _route_labels(scope) -> tuple:
+    # Label by route template, not raw path, so ids do not explode the series count.
+    route = scope.get("route")
+    return ("method", scope["method"]), ("route", route.path if route is not None else "unmatched")
+
+
+class ProfilingMiddleware:
+    """Per-route latency, DB, serialization and password hashing histograms, plus cProfile sampling.
+
+    A sampled request runs under cProfile and the profile is written to ``output_dir`` if the
+    request took longer than ``slow_request_ms``. cProfile hooks the whole thread, so at most one
+    request is sampled at a time and its profile also contains whatever other requests ran on the
+    event loop meanwhile.
+    """
+
+    def __init__(self, app, slow_request_ms: float = PROFILING_SLOW_REQUEST_MS,
+                 sample_rate: float = PROFILING_SAMPLE_RATE, output_dir: str = PROFILING_OUTPUT_DIR):
+        self.app = app
+        self.slow_request_seconds = slow_request_ms / 1000
+        self.sample_rate = sample_rate
+        self.output_dir = Path(output_dir)
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile = RequestProfile()
+        token = current_profile.set(profile)
+        profiler = self._start_profiler()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_profile.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                if elapsed >= self.slow_request_seconds:
+                    self._dump(profiler, scope, elapsed)
+            labels = _route_labels(scope)
+            metrics = routes.get(labels)
+            if metrics is None:
+                metrics = routes[labels] = RouteMetrics()
+            metrics.observe(elapsed, profile)
+
+    def _start_profiler(self) -> Optional[cProfile.Profile]:
+        if self._profiling or not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        self._profiling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _dump(self, profiler: cProfile.Profile, scope, elapsed: float):
+        (_, method), (_, route) = _route_labels(scope)
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+        path = self.output_dir / f"{timestamp}-{method}-{name}-{elapsed * 1000:.0f}ms.prof"
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError:
+            logger.exception("could not write profile to %s", path)
+            return
+        logger.info("slow request %s %s took %.3fs, profile written to %s", method, route, elapsed, path)
+
+
+def render_metrics() -> str:
+    families = (
+        ("http_request_duration_seconds", "Request latency.", "duration_seconds"),
+        ("http_request_db_seconds", "Time spent executing SQL statements per request.", "db_seconds"),
+        ("http_request_db_statements", "SQL statements executed per request.", "statements"),
+        ("http_request_serialization_seconds", "Time spent encoding JSON response bodies per request.",
+         "serialization_seconds"),
+        ("http_request_password_hash_seconds", "Time spent hashing or verifying passwords per request.",
+         "password_hash_seconds"),
+    )
+    lines = []
+    for name, help_text, attribute in families:
+        lines += render_histogram(name, help_text, {labels: getattr(metrics, attribute)
+                                                    for labels, metrics in routes.items()})
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -1,13 +1,30 @@
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import Column, String, Integer, UUID, Table, ForeignKey
+from sqlalchemy import Column, String, Integer, SmallInteger, BigInteger, DateTime, UUID, Table, ForeignKey, Index, func
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
+from sqlalchemy.types import TypeDecorator
 import uuid
+from app.utils.enum import GENRE_CODES, GENRES_BY_CODE, Genre
 
 class ModelBase(AsyncAttrs, DeclarativeBase):
     pass
 
+class GenreArray(TypeDecorator):
+    # Genre names at the Python boundary, smallint codes in the column.
+    impl = ARRAY(SmallInteger)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return [GENRE_CODES[Genre(genre)] for genre in value]
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return [GENRES_BY_CODE[code].value for code in value]
+
 class User(ModelBase):
     __tablename__ = "users"
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -19,9 +36,17 @@ class Book(ModelBase):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String, nullable=False)
     published_year = Column(Integer)
-    genres = Column(ARRAY(String), nullable=False)  # Use PostgreSQL ARRAY
+    genres = Column(GenreArray, nullable=False)  # smallint[] of GENRE_CODES
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every update, backs ETags
     authors = relationship("Author", secondary="book_authors", back_populates="books")
 
+    __table_args__ = (
+        Index("ix_books_title_id", "title", "id"),
+        Index("ix_books_published_year_id", "published_year", "id"),
+        Index("ix_books_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        Index("ix_books_genres_gin", "genres", postgresql_using="gin"),
+    )
+
 book_authors = Table(
     "book_authors",
     ModelBase.metadata,
@@ -34,3 +59,56 @@ class Author(ModelBase):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=False, unique=True)
     books = relationship("Book", secondary="book_authors", back_populates="authors")
+
+    __table_args__ = (
+        Index("ix_authors_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
+class CatalogState(ModelBase):
+    __tablename__ = "catalog_state"
+    # One counter per slot; a committing write bumps the slot of its backend once, and the catalog
+    # version is the sum of all slots.
+    id = Column(SmallInteger, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+# Books touched by each write to books or book_authors, recorded by statement-level triggers with the
+# writing transaction's id, so a catalog snapshot can re-read only what changed since its last load.
+catalog_changes = Table(
+    "catalog_changes",
+    ModelBase.metadata,
+    Column("xid", BigInteger, nullable=False),  # pg_current_xact_id() of the writer
+    Column("book_id", UUID(as_uuid=True), nullable=False),
+    Column("changed_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+    Index("ix_catalog_changes_xid", "xid"),
+    Index("ix_catalog_changes_changed_at", "changed_at"),
+)
+
+# Single row (id 1). The catalog_changes triggers write only while ``active_until`` is in the future;
+# processes with the catalog snapshot enabled keep pushing it forward.
+catalog_changes_lease = Table(
+    "catalog_changes_lease",
+    ModelBase.metadata,
+    Column("id", SmallInteger, primary_key=True),
+    Column("active_until", DateTime(timezone=True), nullable=False),
+)
+
+# Facet count changes of uncommitted transactions, appended by statement-level triggers on books and
+# book_authors; a deferred trigger folds a transaction's rows into facet_counts when it commits.
+facet_deltas = Table(
+    "facet_deltas",
+    ModelBase.metadata,
+    Column("xid", BigInteger, nullable=False),  # pg_current_xact_id() of the writer
+    Column("facet", String, nullable=False),
+    Column("value", String, nullable=False),
+    Column("delta", BigInteger, nullable=False),
+    Index("ix_facet_deltas_xid", "xid"),
+)
+
+class FacetCount(ModelBase):
+    # Author values are author ids. One counter per slot; a committing write adds its deltas to the
+    # slot of its backend in one upsert in key order, and a count is the sum over all slots.
+    __tablename__ = "facet_counts"
+    facet = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    slot = Column(SmallInteger, primary_key=True, default=0)
+    count = Column(BigInteger, nullable=False, default=0)
@@ -5,23 +5,26 @@ from app.crud.user import create_user, get_user_by_username
 from app.schemas.user import UserCreate, UserResponse
 from app.dependencies import get_db
 from app.utils.jwt import create_access_token
-from passlib.context import CryptContext
+from app.utils.password import verify_password
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
     db_user = await get_user_by_username(db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already exists")
+    # Hand the connection back to the pool while bcrypt runs; create_user checks one out again.
+    await db.rollback()
     return await create_user(db, user)
 
 @router.post("/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     user = await get_user_by_username(db, form_data.username)
-    if not user or not pwd_context.verify(form_data.password, user.hashed_password):
+    hashed_password = user.hashed_password if user else None
+    # Hand the connection back to the pool while bcrypt runs.
+    await db.rollback()
+    if not hashed_password or not await verify_password(form_data.password, hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
-    access_token = create_access_token({"sub": user.username})
+    access_token = create_access_token({"sub": form_data.username})
     return {"access_token": access_token, "token_type": "bearer"}
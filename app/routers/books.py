@@ -1,60 +1,230 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
+import json
+import time
 import uuid
-from app.crud.book import create_book, get_books, get_book, update_book, delete_book, bulk_upload_books, search_books
-from app.schemas.book import BookCreate, BookResponse, BookUpdate
-from app.dependencies import get_db, get_current_user
+from app.config import BULK_UPLOAD_CHUNK_SIZE, EXPORT_PARTITION_SIZE
+from app.crud.book import (create_book, get_books, get_books_page, get_book_data, update_book, delete_book,
+                           bulk_upload_books, search_books, ingest_chunk, get_book_version, get_catalog_version,
+                           count_books, get_books_by_ids, get_facets, stream_books)
+from app.schemas.book import BookBatchRequest, BookBatchResponse, BookCreate, BookResponse, BookUpdate
+from app.database import async_session, read_session
+from app.dependencies import get_current_user, get_read_db, get_write_db
+from app.jobs import bulk_upload
+from app.utils.cache import observe_catalog_version
+from app.utils.etag import book_etag, catalog_etag, etag_matches
+from app.utils.read_your_writes import mark_write
+from app.utils.responses import ORJSONResponse
+from app.utils.stream import (RequestBoundStreamingResponse, csv_lines, gzip_chunks, iter_csv_records,
+                              iter_ndjson_records, ndjson_lines, validation_message)
 
 router = APIRouter()
 
+
+async def _check_catalog_etag(request: Request, response: Response,
+                             db: AsyncSession) -> Tuple[int, Optional[Response]]:
+    # List and search pages only change when the catalog does, so reading the catalog version
+    # (a sum over the 64 catalog_state slots) answers a conditional GET without running the query.
+    # The version is returned too: it keys cached pages and is matched against the catalog snapshot.
+    version = await get_catalog_version(db)
+    await observe_catalog_version(version)
+    etag = catalog_etag(version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return version, Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return version, None
+
+
+def _json(content, response: Response) -> ORJSONResponse:
+    # Listing payloads are already plain dicts of JSON-ready values; handing them straight to
+    # orjson skips jsonable_encoder and response_model validation. Returning a Response bypasses
+    # FastAPI's header merge, so headers set on ``response`` are copied over.
+    return ORJSONResponse(content, headers=dict(response.headers))
+
+
 @router.post("/", response_model=BookResponse, status_code=status.HTTP_201_CREATED,
              description="Create a new book. Requires JWT authentication.")
-async def create_book_endpoint(book: BookCreate, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+async def create_book_endpoint(book: BookCreate, db: AsyncSession = Depends(get_write_db), user=Depends(get_current_user)):
     db_book = await create_book(db, book)
     return BookResponse.from_orm(db_book)
 
 @router.get("/",
             description="List books with pagination, sorting, and filtering. Parameters:\n"
                         "- **skip**: Number of records to skip (default: 0).\n"
-                        "- **limit**: Maximum number of records to return (default: 10).\n"
+                        "- **limit**: Maximum number of records to return (default: 10, at most 100).\n"
                         "- **sort_by**: Sort by field (options: 'title', 'published_year'; default: 'title').\n"
                         "- **title**: Filter by book title (partial match, case-insensitive).\n"
                         "- **author**: Filter by author name (partial match, case-insensitive).\n"
                         "- **genre**: Filter by genres (comma-separated list, e.g., 'Fiction,Fantasy'; must be one of: Fiction, Non-Fiction, Science, Fantasy, Biography, Mystery, Thriller, Romance, Historical, Adventure, Horror, Science Fiction, Dystopian, Memoir, Self-Help).\n"
                         "- **year_from**: Filter by minimum published year.\n"
-                        "- **year_to**: Filter by maximum published year.")
+                        "- **year_to**: Filter by maximum published year.\n"
+                        "- **cursor**: Switch to keyset pagination. Pass an empty value for the first page and the "
+                        "returned `next_cursor` for the following ones; `skip` is ignored and the response becomes "
+                        "`{\"items\": [...], \"next_cursor\": ...}` (`null` on the last page).\n"
+                        "- **count**: Also return `total` (books matching the filters) and `has_more`; the response "
+                        "becomes `{\"items\": [...], \"total\": ..., \"has_more\": ...}`. `exact` runs `COUNT(*)`, "
+                        "`cached` reuses that count until the catalog changes, `estimate` returns the planner's "
+                        "estimate (near-free on large catalogs; exact on the last page).\n\n"
+                        "Responses carry an `ETag` tied to the catalog version; send it back in `If-None-Match` "
+                        "to get `304 Not Modified` while the catalog is unchanged.")
 async def get_books_endpoint(
-    db: AsyncSession = Depends(get_db),
-    skip: int = 0,
-    limit: int = 10,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
     sort_by: str = "title",
     title: Optional[str] = None,
     author: Optional[str] = None,
     genre: Optional[List[str]] = Query(None, description="Comma-separated list of genres (e.g., 'Fiction,Fantasy')"),
     year_from: Optional[int] = None,
-    year_to: Optional[int] = None
+    year_to: Optional[int] = None,
+    cursor: Optional[str] = None,
+    count: Optional[str] = None
+):
+    version, not_modified = await _check_catalog_etag(request, response, db)
+    if not_modified:
+        return not_modified
+    genre_str = ",".join(genre) if genre else None
+    try:
+        total = None
+        if count is not None:
+            total = await count_books(db, count, title, author, genre_str, year_from, year_to, version)
+        if cursor is not None:
+            page = await get_books_page(db, cursor, limit, sort_by, title, author, genre_str, year_from, year_to,
+                                        version)
+            if total is not None:
+                page = dict(page, total=total, has_more=page["next_cursor"] is not None)
+            return _json(page, response)
+        if total is None:
+            return _json(await get_books(db, skip, limit, sort_by, title, author, genre_str, year_from, year_to,
+                                         version), response)
+        # One extra row answers has_more whatever the count mode.
+        books = await get_books(db, skip, limit + 1, sort_by, title, author, genre_str, year_from, year_to, version)
+        has_more = len(books) > limit
+        books = books[:limit]
+        if count == "estimate":
+            # The page itself bounds the estimate, and pins it down once the last row is in sight.
+            if has_more:
+                total = max(total, skip + len(books) + 1)
+            elif books or not skip:
+                total = skip + len(books)
+            else:
+                total = min(total, skip)
+        return _json({"items": books, "total": total, "has_more": has_more}, response)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/facets",
+            description="Counts of books per genre, per decade and for the top authors, for any combination of the "
+                        "listing filters (`title`, `author`, `genre`, `year_from`, `year_to`).\n"
+                        "- **top_authors**: Number of authors to return, by descending book count (default: 10).\n\n"
+                        "Supports `If-None-Match` with the returned `ETag`.")
+async def get_facets_endpoint(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    genre: Optional[List[str]] = Query(None, description="Comma-separated list of genres (e.g., 'Fiction,Fantasy')"),
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    top_authors: int = Query(10, ge=0, le=100)
 ):
+    version, not_modified = await _check_catalog_etag(request, response, db)
+    if not_modified:
+        return not_modified
     genre_str = ",".join(genre) if genre else None
-    return await get_books(db, skip, limit, sort_by, title, author, genre_str, year_from, year_to)
+    return _json(await get_facets(db, title, author, genre_str, year_from, year_to, top_authors, version), response)
 
 @router.get("/search/",
-            description="Fuzzy search books by title or author name (case-insensitive).\n"
-                        "- **query**: Search term to match against book title or author name (e.g., 'Harry' for Harry Potter).")
-async def search_books_endpoint(query: str, db: AsyncSession = Depends(get_db)):
-    return await search_books(db, query)
+            description="Fuzzy search books by title or author name (case-insensitive), best matches first.\n"
+                        "- **query**: Search term to match against book title or author name (e.g., 'Harry' for Harry Potter).\n"
+                        "- **skip**: Number of results to skip (default: 0).\n"
+                        "- **limit**: Maximum number of results to return (default: 10).\n\n"
+                        "Supports `If-None-Match` with the returned `ETag`.")
+async def search_books_endpoint(request: Request, response: Response, query: str, skip: int = Query(0, ge=0),
+                                limit: int = Query(10, ge=1, le=100), db: AsyncSession = Depends(get_read_db)):
+    version, not_modified = await _check_catalog_etag(request, response, db)
+    if not_modified:
+        return not_modified
+    return _json(await search_books(db, query, skip, limit, version), response)
+
+EXPORT_CSV_COLUMNS = ["id", "title", "published_year", "genres", "authors"]
+# Same header /import reads, so a CSV export can be imported elsewhere as is.
+EXPORT_CSV_HEADER = b"id,title,published_year,genres,author_names\n"
+
+
+async def _export_books(format: str, **filters) -> AsyncIterator[bytes]:
+    # Owns its session: the request's session is closed before a streamed body is sent.
+    if format == "csv":
+        yield EXPORT_CSV_HEADER
+    async with read_session() as db:
+        async for rows in stream_books(db, EXPORT_PARTITION_SIZE, **filters):
+            yield csv_lines(rows, EXPORT_CSV_COLUMNS) if format == "csv" else ndjson_lines(rows)
+
+
+@router.get("/export",
+            description="Stream the whole catalog, or the books matching the listing filters (`title`, `author`, "
+                        "`genre`, `year_from`, `year_to`), ordered by id.\n"
+                        "- **format**: `ndjson` (one book per line, as returned by the API; default) or `csv` "
+                        "(the `/import` format, list columns separated by `|`).\n"
+                        "- **gzip**: Compress the output (default: false).\n\n"
+                        "Rows are read through a server-side cursor, EXPORT_PARTITION_SIZE at a time, and written "
+                        "to the client as they arrive.")
+async def export_books_endpoint(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    title: Optional[str] = None,
+    author: Optional[str] = None,
+    genre: Optional[List[str]] = Query(None, description="Comma-separated list of genres (e.g., 'Fiction,Fantasy')"),
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None
+):
+    genre_str = ",".join(genre) if genre else None
+    body = _export_books(format, title=title, author=author, genre=genre_str, year_from=year_from, year_to=year_to)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"books.{format}"
+    if gzip:
+        body, media_type, filename = gzip_chunks(body), "application/gzip", filename + ".gz"
+    return StreamingResponse(body, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.post("/batch", response_model=BookBatchResponse,
+             description="Fetch several books by UUID in one request. Books are returned in the requested order "
+                         "(duplicates collapsed) and unknown ids are listed under `missing`. "
+                         "At most BOOK_BATCH_MAX_IDS (default 100) ids per request.")
+async def get_books_batch_endpoint(batch: BookBatchRequest, db: AsyncSession = Depends(get_read_db)):
+    books, missing = await get_books_by_ids(db, batch.ids)
+    return {"books": books, "missing": missing}
 
 @router.get("/{book_id:uuid}", response_model=BookResponse,
-            description="Get a book by its UUID.")
-async def get_book_endpoint(book_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    book = await get_book(db, str(book_id))
+            description="Get a book by its UUID. Responses carry an `ETag` derived from the book's version; "
+                        "send it back in `If-None-Match` to get `304 Not Modified` while the book is unchanged.")
+async def get_book_endpoint(book_id: uuid.UUID, request: Request, response: Response,
+                            db: AsyncSession = Depends(get_read_db)):
+    # One primary-key read answers If-None-Match and tells whether the cached copy is current:
+    # other workers' writes only drop the entry in their own cache.
+    version = await get_book_version(db, str(book_id))
+    if version is None:
+        raise HTTPException(status_code=404, detail="Book not found")
+    etag = book_etag(book_id, version)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    book = await get_book_data(db, str(book_id), version)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return BookResponse.from_orm(book)
+    response.headers["ETag"] = book_etag(book_id, book["version"])
+    return book
 
 @router.put("/{book_id:uuid}", response_model=BookResponse,
             description="Update a book by its UUID. Requires JWT authentication.")
-async def update_book_endpoint(book_id: uuid.UUID, book: BookUpdate, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+async def update_book_endpoint(book_id: uuid.UUID, book: BookUpdate, db: AsyncSession = Depends(get_write_db), user=Depends(get_current_user)):
     updated_book = await update_book(db, str(book_id), book)
     if not updated_book:
         raise HTTPException(status_code=404, detail="Book not found")
@@ -62,13 +232,104 @@ async def update_book_endpoint(book_id: uuid.UUID, book: BookUpdate, db: AsyncSe
 
 @router.delete("/{book_id:uuid}", status_code=status.HTTP_204_NO_CONTENT,
                description="Delete a book by its UUID. Also deletes authors with no remaining books. Requires JWT authentication.")
-async def delete_book_endpoint(book_id: uuid.UUID, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
+async def delete_book_endpoint(book_id: uuid.UUID, db: AsyncSession = Depends(get_write_db), user=Depends(get_current_user)):
     success = await delete_book(db, str(book_id))
     if not success:
         raise HTTPException(status_code=404, detail="Book not found")
 
 @router.post("/bulk-upload", response_model=List[BookResponse],
-             description="Bulk upload multiple books. Requires JWT authentication.")
-async def bulk_upload_books_endpoint(books: List[BookCreate], db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
-    created_books = await bulk_upload_books(db, books)
-    return [BookResponse.from_orm(book) for book in created_books]
\ No newline at end of file
+             description="Bulk upload multiple books. Books are inserted and committed in chunks; "
+                         "the response carries the chunk count and total ingestion time in the "
+                         "`X-Bulk-Upload-Chunks` and `X-Bulk-Upload-Seconds` headers. Requires JWT authentication.")
+async def bulk_upload_books_endpoint(books: List[BookCreate], response: Response, db: AsyncSession = Depends(get_write_db),
+                                     user=Depends(get_current_user)):
+    result = await bulk_upload_books(db, books)
+    response.headers["X-Bulk-Upload-Chunks"] = str(len(result.chunks))
+    response.headers["X-Bulk-Upload-Seconds"] = f"{sum(chunk.seconds for chunk in result.chunks):.3f}"
+    return _json(result.books, response)
+
+@router.post("/bulk-upload/jobs", status_code=status.HTTP_202_ACCEPTED,
+             description="Queue a bulk upload and return immediately. The body is the same JSON array as for "
+                         "`/bulk-upload`; it is spooled to a temporary file and background workers validate and "
+                         "ingest it in chunks. Poll the returned job (also in the `Location` header) for progress. "
+                         "Answers `503` with `Retry-After` while the job queue is full and `413` for more records "
+                         "than one job may hold. Requires JWT authentication.",
+             openapi_extra={"requestBody": {"required": True, "content": {
+                 "application/json": {"schema": {"type": "array", "items": {"type": "object"}}}}}})
+async def submit_bulk_upload_job_endpoint(request: Request, response: Response, user=Depends(get_current_user)):
+    try:
+        job = await bulk_upload.submit(request.stream(), user["sub"])
+    except bulk_upload.BulkUploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=f"A job holds at most {e.args[0]} records")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    response.headers["Location"] = str(request.url_for("get_bulk_upload_job_endpoint", job_id=job.id))
+    return job.to_dict()
+
+@router.get("/bulk-upload/jobs/{job_id}",
+            description="Status of a queued bulk upload: `queued`, `running`, `succeeded` or `failed`, records "
+                        "processed, imported and rejected, throughput, and per-record validation errors by index "
+                        "in the submitted array. Only the submitting user can see a job. Requires JWT authentication.")
+async def get_bulk_upload_job_endpoint(job_id: str, user=Depends(get_current_user)):
+    job = bulk_upload.get_job(job_id, user["sub"])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+def _progress_line(**fields) -> bytes:
+    return (json.dumps(fields, default=str) + "\n").encode()
+
+
+async def _import_books(records, batch_size: int) -> AsyncIterator[bytes]:
+    imported = failed = batches = 0
+    batch: List[BookCreate] = []
+    async with async_session() as db:
+        async def flush():
+            nonlocal imported, batches, batch
+            started = time.perf_counter()
+            created = await ingest_chunk(db, batch)
+            imported += len(created)
+            batches += 1
+            batch = []
+            return _progress_line(batch=batches, books=len(created), imported=imported,
+                                  seconds=round(time.perf_counter() - started, 3))
+
+        try:
+            async for line_no, record in records:
+                if isinstance(record, ValueError):
+                    failed += 1
+                    yield _progress_line(line=line_no, error=str(record))
+                    continue
+                try:
+                    batch.append(BookCreate(**record))
+                except ValidationError as e:
+                    failed += 1
+                    yield _progress_line(line=line_no, error=validation_message(e))
+                    continue
+                if len(batch) >= batch_size:
+                    yield await flush()
+            if batch:
+                yield await flush()
+        except (ValueError, SQLAlchemyError) as e:
+            await db.rollback()
+            yield _progress_line(done=False, imported=imported, failed=failed, error=str(e))
+            return
+    yield _progress_line(done=True, imported=imported, failed=failed)
+
+
+@router.post("/import",
+             description="Stream a catalog import. The request body is read incrementally as NDJSON "
+                         "(one `BookCreate` object per line) or CSV with a header row "
+                         "(`title,published_year,genres,author_names`, list columns separated by `|`). "
+                         "Valid records are committed in batches while the body is still being read; the response "
+                         "is an NDJSON stream of per-batch progress, per-line errors and a final summary. "
+                         "The format defaults to CSV for `text/csv` bodies and NDJSON otherwise. Requires JWT authentication.")
+async def import_books_endpoint(request: Request,
+                                format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+                                user=Depends(get_current_user)):
+    if format is None:
+        format = "csv" if request.headers.get("content-type", "").startswith("text/csv") else "ndjson"
+    parse = iter_csv_records if format == "csv" else iter_ndjson_records
+    return RequestBoundStreamingResponse(_import_books(parse(request.stream()), BULK_UPLOAD_CHUNK_SIZE),
+                                         media_type="application/x-ndjson",
+                                         background=BackgroundTask(mark_write, user["sub"]))
\ No newline at end of file
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends
+from app import database
+from app.crud.author import author_resolver
+from app.crud.snapshot import catalog_snapshot
+from app.dependencies import get_current_user
+from app.jobs import bulk_upload
+from app.middleware import admission
+from app.utils import password
+from app.utils.cache import cache
+
+# Pool, cache and job internals are not for anonymous callers.
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+@router.get("/cache", description="Hit, miss and eviction counters of the book read cache.")
+async def cache_stats():
+    return cache.stats()
+
+@router.get("/password-hashing", description="Password hashing pool size, queue depth and rejected requests.")
+async def password_hashing_stats():
+    return password.stats()
+
+@router.get("/db", description="Connection pool occupancy, checkout wait times and per-statement timings.")
+async def db_stats():
+    return database.stats()
+
+@router.get("/authors", description="Author name resolution batches, created authors and name cache hits.")
+async def author_resolver_stats():
+    return author_resolver.stats()
+
+@router.get("/jobs", description="Bulk upload workers, queue depth and jobs by status.")
+async def bulk_upload_job_stats():
+    return bulk_upload.stats()
+
+@router.get("/snapshot", description="In-memory catalog snapshot size, version, load time, hits and SQL fallbacks.")
+async def catalog_snapshot_stats():
+    return catalog_snapshot.stats()
+
+@router.get("/admission", description="Per route class concurrency budget, in-flight and queued requests, and shed counts.")
+async def admission_stats():
+    return admission.stats()
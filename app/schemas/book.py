@@ -2,6 +2,8 @@ from pydantic import BaseModel, Field, validator
 from typing import List, Optional
 from datetime import datetime
 import uuid
+from app.config import BOOK_BATCH_MAX_IDS
+from app.utils.enum import Genre
 
 class BookBase(BaseModel):
     title: str = Field(..., min_length=1)
@@ -10,11 +12,7 @@ class BookBase(BaseModel):
 
     @validator("genres")
     def validate_genres(cls, v):
-        valid_genres = [
-            "Fiction", "Non-Fiction", "Science", "Fantasy", "Biography",
-            "Mystery", "Thriller", "Romance", "Historical", "Adventure",
-            "Horror", "Science Fiction", "Dystopian", "Memoir", "Self-Help"
-        ]
+        valid_genres = {genre.value for genre in Genre}
         if not all(genre in valid_genres for genre in v):
             raise ValueError("Invalid genre")
         return v
@@ -56,4 +54,11 @@ class BookResponse(BookBase):
         )
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BookBatchRequest(BaseModel):
+    ids: List[uuid.UUID] = Field(..., min_items=1, max_items=BOOK_BATCH_MAX_IDS)
+
+class BookBatchResponse(BaseModel):
+    books: List[BookResponse]
+    missing: List[uuid.UUID]
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+from app.config import (CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, DATABASE_REPLICA_URL,
+                        READ_YOUR_WRITES_SECONDS)
+
+GENERATION_KEY = "catalog:generation"
+
+
+class CacheBackend:
+    """Async key/value interface the read path is written against.
+
+    A shared backend (e.g. Redis) implements the same methods; ``incr`` must be atomic
+    across processes since it drives list/search invalidation.
+    """
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def get_counter(self, key: str) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class NullCache(CacheBackend):
+    async def get(self, key):
+        return None
+
+    async def set(self, key, value, ttl=None):
+        pass
+
+    async def delete(self, *keys):
+        pass
+
+    async def incr(self, key):
+        return 0
+
+    async def get_counter(self, key):
+        return 0
+
+    def stats(self):
+        return {"backend": "none"}
+
+
+class MemoryCache(CacheBackend):
+    """Per-process LRU with a TTL on every entry.
+
+    Counters live outside the LRU so a generation can never be evicted and reset.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    async def set(self, key, value, ttl=None):
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def incr(self, key):
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def get_counter(self, key):
+        return self._counters.get(key, 0)
+
+    def stats(self):
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def create_cache(backend: str = CACHE_BACKEND) -> CacheBackend:
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown cache backend '{backend}'")
+
+
+cache = create_cache()
+
+
+def book_key(book_id) -> str:
+    return f"book:{book_id}"
+
+
+async def query_key(namespace: str, catalog_version: int, **params) -> str:
+    # Keys embed the catalog generation, so bumping it orphans every cached list/search page, and the
+    # catalog version the request read, so a lagging replica's rows are never served to a reader
+    # routed to the primary (or the other way round) under the same key.
+    generation = await cache.get_counter(GENERATION_KEY)
+    normalized = json.dumps({k: v for k, v in params.items() if v is not None}, sort_keys=True, default=str)
+    digest = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"{namespace}:{generation}:{catalog_version}:{digest}"
+
+
+def _invalidate_again(coro_function, *args) -> None:
+    # Replica reads inside the lag window can re-cache rows from before the write; a second
+    # invalidation once READ_YOUR_WRITES_SECONDS has passed drops them.
+    if DATABASE_REPLICA_URL:
+        loop = asyncio.get_running_loop()
+        loop.call_later(READ_YOUR_WRITES_SECONDS, lambda: loop.create_task(coro_function(*args)))
+
+
+async def _invalidate_catalog() -> None:
+    await cache.incr(GENERATION_KEY)
+
+
+async def _invalidate_books(book_ids: List) -> None:
+    await cache.delete(*(book_key(book_id) for book_id in book_ids))
+    await _invalidate_catalog()
+
+
+async def invalidate_catalog() -> None:
+    await _invalidate_catalog()
+    _invalidate_again(_invalidate_catalog)
+
+
+async def invalidate_books(book_ids: List) -> None:
+    await _invalidate_books(book_ids)
+    _invalidate_again(_invalidate_books, list(book_ids))
+
+
+_observed_catalog_version: Optional[int] = None
+
+
+async def observe_catalog_version(version: int) -> None:
+    # Writes made through other workers only show up as a newer database catalog version;
+    # seeing one drops this worker's cached list and search pages. An older version is a
+    # lagging replica and must not count as a change.
+    global _observed_catalog_version
+    if _observed_catalog_version is None or version > _observed_catalog_version:
+        if _observed_catalog_version is not None:
+            await invalidate_catalog()
+        _observed_catalog_version = version
@@ -0,0 +1,26 @@
+import base64
+import json
+import uuid
+from typing import Any, Tuple
+
+# JSON types a cursor value may have per sort order; published_year is NULL for undated books.
+VALUE_TYPES = {"title": (str,), "published_year": (int, type(None))}
+
+
+def encode_cursor(sort_by: str, value: Any, book_id: uuid.UUID) -> str:
+    raw = json.dumps([sort_by, value, str(book_id)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, sort_by: str) -> Tuple[Any, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_by, value, book_id = json.loads(raw)
+        book_id = uuid.UUID(book_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort_by != sort_by:
+        raise ValueError("Cursor was issued for a different sort order")
+    if isinstance(value, bool) or not isinstance(value, VALUE_TYPES.get(sort_by, ())):
+        raise ValueError("Invalid cursor")
+    return value, book_id
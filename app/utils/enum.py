@@ -15,4 +15,24 @@ class Genre(str, Enum):
     SCIENCE_FICTION = "Science Fiction"
     DYSTOPIAN = "Dystopian"
     MEMOIR = "Memoir"
-    SELF_HELP = "Self-Help"
\ No newline at end of file
+    SELF_HELP = "Self-Help"
+
+# Stored in books.genres (smallint[]) and facet_counts; codes are persisted, so only ever append.
+GENRE_CODES = {
+    Genre.FICTION: 1,
+    Genre.NON_FICTION: 2,
+    Genre.SCIENCE: 3,
+    Genre.FANTASY: 4,
+    Genre.BIOGRAPHY: 5,
+    Genre.MYSTERY: 6,
+    Genre.THRILLER: 7,
+    Genre.ROMANCE: 8,
+    Genre.HISTORICAL: 9,
+    Genre.ADVENTURE: 10,
+    Genre.HORROR: 11,
+    Genre.SCIENCE_FICTION: 12,
+    Genre.DYSTOPIAN: 13,
+    Genre.MEMOIR: 14,
+    Genre.SELF_HELP: 15,
+}
+GENRES_BY_CODE = {code: genre for genre, code in GENRE_CODES.items()}
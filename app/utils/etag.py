@@ -0,0 +1,19 @@
+from typing import Optional
+
+
+def book_etag(book_id, version: int) -> str:
+    return f'"{book_id}.{version}"'
+
+
+def catalog_etag(version: int) -> str:
+    return f'"catalog.{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison, so a W/ prefix on either side is ignored.
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
@@ -1,16 +1,108 @@
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import base64
+import hashlib
+import hmac
+import json
+import time
 from jose import JWTError, jwt
-from app.config import JWT_SECRET, JWT_ALGORITHM
+from app.config import JWT_SECRET, JWT_ALGORITHM, JWT_BACKEND, TOKEN_CACHE_SIZE
+
+
+def _jose_encode(claims: dict) -> str:
+    return jwt.encode(claims, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def _jose_decode(token: str) -> Optional[dict]:
+    try:
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+
+
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _hmac_encode(claims: dict) -> str:
+    claims = {k: int(v.replace(tzinfo=timezone.utc).timestamp()) if isinstance(v, datetime) else v
+              for k, v in claims.items()}
+    header = _b64encode(json.dumps({"alg": JWT_ALGORITHM, "typ": "JWT"}, separators=(",", ":")).encode())
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    signing_input = header + b"." + payload
+    signature = hmac.new(JWT_SECRET.encode(), signing_input, _HMAC_DIGESTS[JWT_ALGORITHM]).digest()
+    return (signing_input + b"." + _b64encode(signature)).decode()
+
+
+def _hmac_decode(token: str) -> Optional[dict]:
+    # HS* only: verifies the signature with the stdlib and checks exp, which is all
+    # this API issues, without the generic key handling of a full JOSE library.
+    try:
+        signing_input, _, signature = token.encode().rpartition(b".")
+        header_segment, _, payload_segment = signing_input.partition(b".")
+        header = json.loads(_b64decode(header_segment))
+        if header.get("alg") != JWT_ALGORITHM:
+            return None
+        expected = hmac.new(JWT_SECRET.encode(), signing_input, _HMAC_DIGESTS[JWT_ALGORITHM]).digest()
+        if not hmac.compare_digest(expected, _b64decode(signature)):
+            return None
+        payload = json.loads(_b64decode(payload_segment))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    if not isinstance(payload, dict):
+        return None
+    exp = payload.get("exp")
+    if exp is not None and (not isinstance(exp, (int, float)) or exp <= time.time()):
+        return None
+    return payload
+
+
+def load_backend(name: str):
+    if name == "jose":
+        return _jose_encode, _jose_decode
+    if name == "hmac":
+        if JWT_ALGORITHM not in _HMAC_DIGESTS:
+            raise ValueError(f"The hmac JWT backend does not support {JWT_ALGORITHM}")
+        return _hmac_encode, _hmac_decode
+    raise ValueError(f"Unknown JWT backend '{name}'")
+
+
+_encode, _decode = load_backend(JWT_BACKEND)
+
+# token digest -> (payload, exp); only successfully verified tokens with an exp are cached.
+_verified: "OrderedDict[bytes, tuple]" = OrderedDict()
+
 
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=30)
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return _encode(to_encode)
+
 
 def verify_token(token: str):
-    try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
-    except JWTError:
-        return None
\ No newline at end of file
+    key = hashlib.sha256(token.encode()).digest()
+    cached = _verified.get(key)
+    if cached is not None:
+        payload, exp = cached
+        if exp > time.time():
+            _verified.move_to_end(key)
+            return dict(payload)
+        del _verified[key]
+    payload = _decode(token)
+    if payload is None:
+        return None
+    exp = payload.get("exp")
+    if TOKEN_CACHE_SIZE > 0 and isinstance(exp, (int, float)):
+        _verified[key] = (dict(payload), exp)
+        if len(_verified) > TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
+    return payload
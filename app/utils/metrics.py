@@ -0,0 +1,66 @@
+from typing import Dict, List, Sequence
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def snapshot(self) -> Dict:
+        # Cumulative counts per upper bound, as Prometheus reports them.
+        cumulative, running = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            cumulative[str(bound)] = running
+        cumulative["+Inf"] = self.count
+        return {"count": self.count, "sum": self.sum, "buckets": cumulative}
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_histogram(name: str, help_text: str, series: Dict[tuple, Histogram]) -> List[str]:
+    """Prometheus text exposition of one histogram family; ``series`` maps label pairs to histograms."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series.items():
+        prefix = "".join(f'{key}="{_label(value)}",' for key, value in labels)
+        running = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            running += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {running}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+        lines.append(f"{name}_sum{{{prefix.rstrip(',')}}} {histogram.sum}")
+        lines.append(f"{name}_count{{{prefix.rstrip(',')}}} {histogram.count}")
+    return lines
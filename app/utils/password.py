@@ -0,0 +1,50 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from app.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING
+from app.utils.profiling import record_password_hash
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+# without the pickling overhead of a process pool.
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_pending = 0
+_rejected = 0
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    return func(*args), time.perf_counter() - started
+
+
+async def _run(func, *args):
+    global _pending, _rejected
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        _rejected += 1
+        raise PasswordHasherBusy()
+    _pending += 1
+    try:
+        result, seconds = await asyncio.get_running_loop().run_in_executor(_executor, _timed, func, *args)
+        record_password_hash(seconds)
+        return result
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await _run(pwd_context.verify, password, hashed_password)
+
+
+def stats() -> dict:
+    return {"workers": PASSWORD_HASH_WORKERS, "pending": _pending, "max_pending": PASSWORD_HASH_MAX_PENDING,
+            "rejected": _rejected}
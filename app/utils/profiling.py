@@ -0,0 +1,45 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+class RequestProfile:
+    __slots__ = ("db_seconds", "statements", "serialization_seconds", "password_hash_seconds")
+
+    def __init__(self):
+        self.db_seconds = 0.0
+        self.statements = 0
+        self.serialization_seconds = 0.0
+        self.password_hash_seconds = 0.0
+
+
+# Only set by the profiling middleware; with profiling disabled every hook below is a single
+# ContextVar lookup that finds nothing.
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+
+def record_statement(seconds: float) -> None:
+    profile = current_profile.get()
+    if profile is not None:
+        profile.statements += 1
+        profile.db_seconds += seconds
+
+
+def record_password_hash(seconds: float) -> None:
+    profile = current_profile.get()
+    if profile is not None:
+        profile.password_hash_seconds += seconds
+
+
+@contextmanager
+def serialization():
+    profile = current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.serialization_seconds += time.perf_counter() - started
@@ -0,0 +1,22 @@
+import time
+from typing import Dict
+from app.config import READ_YOUR_WRITES_SECONDS
+
+# Kept per process, like the memory cache: only the worker that served a user's write sends
+# that user's reads to the primary during the window. Reads that land on another worker may
+# still miss the write until the replica catches up.
+_recent_writers: Dict[str, float] = {}
+
+
+def mark_write(subject: str) -> None:
+    now = time.monotonic()
+    _recent_writers[subject] = now + READ_YOUR_WRITES_SECONDS
+    if len(_recent_writers) > 10000:
+        for key, until in list(_recent_writers.items()):
+            if until <= now:
+                del _recent_writers[key]
+
+
+def wrote_recently(subject: str) -> bool:
+    until = _recent_writers.get(subject)
+    return until is not None and until > time.monotonic()
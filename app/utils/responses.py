@@ -0,0 +1,15 @@
+from typing import Any
+from fastapi import responses
+from app.utils.profiling import serialization
+
+
+class JSONResponse(responses.JSONResponse):
+    def render(self, content: Any) -> bytes:
+        with serialization():
+            return super().render(content)
+
+
+class ORJSONResponse(responses.ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        with serialization():
+            return super().render(content)
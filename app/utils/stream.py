@@ -0,0 +1,216 @@
+import codecs
+import csv
+import io
+import json
+import zlib
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Tuple, Union
+import orjson
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+
+MAX_LINE_LENGTH = 1024 * 1024
+CSV_LIST_SEPARATOR = "|"
+
+Record = Tuple[int, Union[Dict[str, Any], ValueError]]
+
+
+class RequestBoundStreamingResponse(StreamingResponse):
+    # The default StreamingResponse listens for client disconnects on ``receive``, which would
+    # steal body messages from a generator that is still reading the request body.
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in error.errors())
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+        if len(buffer) > MAX_LINE_LENGTH:
+            raise ValueError(f"Line exceeds {MAX_LINE_LENGTH} characters")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.rstrip("\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield line_no, ValueError("Expected a JSON object")
+            continue
+        yield line_no, record
+
+
+JSON_WHITESPACE = " \t\n\r"
+JSON_DELIMITERS = JSON_WHITESPACE + ",]"
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Decode the elements of a JSON array body one at a time.
+
+    Only the element being decoded is buffered, up to ``MAX_LINE_LENGTH`` characters. Raises
+    ValueError if the body is not a single well-formed JSON array.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer, position, expect = "", 0, "["
+
+    async def pieces():
+        async for chunk in chunks:
+            yield utf8.decode(chunk), False
+        yield utf8.decode(b"", final=True), True
+
+    async for piece, eof in pieces():
+        buffer, position = buffer[position:] + piece, 0
+        while True:
+            while position < len(buffer) and buffer[position] in JSON_WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                break
+            char = buffer[position]
+            if expect == "[":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                expect, position = "first", position + 1
+            elif expect in ("first", "separator") and char == "]":
+                expect, position = "end", position + 1
+            elif expect == "separator":
+                if char != ",":
+                    raise ValueError("Invalid JSON: expected ',' or ']' between array elements")
+                expect, position = "element", position + 1
+            elif expect == "end":
+                raise ValueError("Invalid JSON: extra data after the array")
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError as e:
+                    if eof:
+                        raise ValueError(f"Invalid JSON: {e.msg}")
+                    end = None
+                if not eof and (end is None or end == len(buffer) or buffer[end] not in JSON_DELIMITERS):
+                    # The element, or a number it ends with ("1" of "1e5"), may go on in the next chunk.
+                    if len(buffer) - position > MAX_LINE_LENGTH:
+                        raise ValueError(f"Array element exceeds {MAX_LINE_LENGTH} characters")
+                    break
+                yield value
+                expect, position = "separator", end
+    if expect != "end":
+        raise ValueError("Invalid JSON: unterminated array")
+
+
+class _RecordFeed:
+    # Line source for a single csv.reader. Lines are only handed over once they form whole
+    # records, so the reader never runs dry inside a quoted field.
+    def __init__(self):
+        self.lines: Deque[str] = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+def _ends_quoted(line: str, quoted: bool) -> bool:
+    # Whether ``line`` ends inside a quoted field, by csv's default dialect: a quote opens a field
+    # only at its start, and a doubled quote inside one is a literal quote.
+    index = line.find('"')
+    while index >= 0:
+        if quoted:
+            if line.startswith('"', index + 1):
+                index += 1
+            else:
+                quoted = False
+        elif index == 0 or line[index - 1] == ",":
+            quoted = True
+        index = line.find('"', index + 1)
+    return quoted
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Record]:
+    """Parse CSV with a header row; ``genres`` and ``author_names`` hold ``|``-separated lists.
+
+    Quoted fields may contain newlines; records are numbered by the line they start on.
+    """
+    feed = _RecordFeed()
+    reader = csv.reader(feed)
+    header = None
+    quoted = False
+    line_no = start = length = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not feed.lines:
+            if not line.strip():
+                continue
+            start = line_no
+        feed.lines.append(line + "\n")
+        quoted = _ends_quoted(line, quoted)
+        length += len(line)
+        if quoted:
+            if length > MAX_LINE_LENGTH:
+                raise ValueError(f"Record starting on line {start} exceeds {MAX_LINE_LENGTH} characters")
+            continue
+        length = 0
+        try:
+            values = next(reader)
+        except csv.Error as e:
+            feed.lines.clear()
+            yield start, ValueError(f"Invalid CSV: {e}")
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        record: Dict[str, Any] = dict(zip(header, values))
+        for key in ("genres", "author_names"):
+            if key in record:
+                record[key] = [item.strip() for item in record[key].split(CSV_LIST_SEPARATOR) if item.strip()]
+        yield start, record
+    if feed.lines:
+        yield start, ValueError("Unterminated quoted field")
+
+
+def ndjson_lines(rows: List[Dict[str, Any]]) -> bytes:
+    return b"".join(orjson.dumps(row) + b"\n" for row in rows)
+
+
+def csv_lines(rows: List[Dict[str, Any]], columns: List[str]) -> bytes:
+    """Write ``rows`` in the format ``iter_csv_records`` reads: list values are joined with ``|``."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    for row in rows:
+        writer.writerow([CSV_LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+                         for value in (row[column] for column in columns)])
+    return out.getvalue().encode()
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
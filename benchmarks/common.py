@@ -0,0 +1,20 @@
+import statistics
+from typing import Dict, List, Optional
+
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict:
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+        "mean_ms": statistics.fmean(samples) if samples else None,
+    }
@@ -0,0 +1,67 @@
+"""Compare genre storage as varchar[] (names) and smallint[] (GENRE_CODES): table/index size and filter latency.
+
+    python -m benchmarks.genre_storage --rows 1000000
+
+Both layouts are filled with the same synthetic genre lists in temporary tables of the database
+configured by DATABASE_URL, indexed with GIN like books.genres, and queried with the containment
+filter `GET /api/v1/books/?genre=...` uses.
+"""
+import argparse
+import asyncio
+import random
+import time
+from sqlalchemy import text
+from app.database import async_session
+from app.utils.enum import GENRE_CODES, Genre
+from benchmarks.common import summarize
+from benchmarks.seed import generate_books
+
+LAYOUTS = {
+    "names": ("varchar[]", lambda genres: genres),
+    "codes": ("smallint[]", lambda genres: [GENRE_CODES[Genre(genre)] for genre in genres]),
+}
+FILTERS = [["Fiction"], ["Science Fiction"], ["Self-Help"], ["Fantasy", "Adventure"]]
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    genre_lists = [book.genres for book in generate_books(args.rows, ["bench"], args.genre_skew, rng)]
+    async with async_session() as db:
+        for name, (column_type, convert) in LAYOUTS.items():
+            table = f"genre_bench_{name}"
+            await db.execute(text(f"CREATE TEMP TABLE {table} (id serial PRIMARY KEY, genres {column_type} NOT NULL)"))
+            insert = text(f"INSERT INTO {table} (genres) VALUES (:genres)")
+            for start in range(0, len(genre_lists), args.chunk_size):
+                chunk = genre_lists[start:start + args.chunk_size]
+                await db.execute(insert, [{"genres": convert(genres)} for genres in chunk])
+            await db.execute(text(f"CREATE INDEX {table}_gin ON {table} USING gin (genres)"))
+            await db.execute(text(f"ANALYZE {table}"))
+
+            sizes = (await db.execute(text(
+                f"SELECT pg_table_size('{table}'), pg_relation_size('{table}_gin'), "
+                f"avg(pg_column_size(genres)) FROM {table}"
+            ))).one()
+            print(f"{name:>6} ({column_type}): table {sizes[0] / 2 ** 20:.1f} MiB, GIN index {sizes[1] / 2 ** 20:.1f} MiB, "
+                  f"{float(sizes[2]):.1f} bytes per value")
+
+            query = text(f"SELECT count(*) FROM {table} WHERE genres @> :genres")
+            for genres in FILTERS:
+                latencies = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    matches = (await db.execute(query, {"genres": convert(genres)})).scalar_one()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                summary = summarize(latencies)
+                print(f"{'':>8}{' & '.join(genres):<22} {matches:>9} rows  p50 {summary['p50_ms']:.2f}ms  "
+                      f"p95 {summary['p95_ms']:.2f}ms")
+        await db.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--genre-skew", type=float, default=1.0)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
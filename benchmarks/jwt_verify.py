@@ -0,0 +1,32 @@
+"""Micro-benchmark for app.utils.jwt.verify_token.
+
+Compares raw decoding with each available backend against a warm verified-token cache:
+
+    JWT_SECRET=secret python -m benchmarks.jwt_verify --iterations 20000
+"""
+import argparse
+import json
+import timeit
+from app.utils import jwt as jwt_utils
+
+
+def measure(func, iterations):
+    seconds = min(timeit.repeat(func, number=iterations, repeat=3))
+    return round(seconds / iterations * 1_000_000, 2)
+
+
+def main(args):
+    token = jwt_utils.create_access_token({"sub": "bench-user"})
+    results = {}
+    for name in ("jose", "hmac"):
+        _, decode = jwt_utils.load_backend(name)
+        results[f"{name}_decode_us"] = measure(lambda: decode(token), args.iterations)
+    jwt_utils.verify_token(token)
+    results["cached_verify_us"] = measure(lambda: jwt_utils.verify_token(token), args.iterations)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    main(parser.parse_args())
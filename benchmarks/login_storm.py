@@ -0,0 +1,76 @@
+"""Measure GET /api/v1/books/ latency while a burst of logins hits the same server.
+
+Run it against a server started from each revision you want to compare, e.g.
+
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.login_storm --base-url http://localhost:8000 --logins 200 --concurrency 50
+
+The user given by --username/--password is registered if it does not exist yet.
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+from benchmarks.common import summarize
+
+
+async def read_loop(client, stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/api/v1/books/", params={"limit": 10})
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def login_worker(client, queue, args, statuses):
+    while True:
+        try:
+            queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+        response = await client.post("/auth/login", data={"username": args.username, "password": args.password})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency + args.readers)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        await client.post("/auth/register", json={"username": args.username, "password": args.password})
+
+        baseline = []
+        stop = asyncio.Event()
+        readers = [asyncio.create_task(read_loop(client, stop, baseline)) for _ in range(args.readers)]
+        await asyncio.sleep(args.warmup)
+        stop.set()
+        await asyncio.gather(*readers)
+
+        during = []
+        statuses = {}
+        queue = asyncio.Queue()
+        for _ in range(args.logins):
+            queue.put_nowait(None)
+        stop = asyncio.Event()
+        readers = [asyncio.create_task(read_loop(client, stop, during)) for _ in range(args.readers)]
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker(client, queue, args, statuses) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await asyncio.gather(*readers)
+
+    print(json.dumps({
+        "reads_idle": summarize(baseline),
+        "reads_during_logins": summarize(during),
+        "logins": {"count": args.logins, "seconds": elapsed, "statuses": statuses},
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="bench-user")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of idle reads measured as a baseline")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,215 @@
+"""Replay request mixes against app.main:app in-process and record latency, throughput and SQL per request.
+
+    python -m benchmarks.seed --books 100000 --truncate
+    CACHE_BACKEND=none python -m benchmarks.run --requests 500 --concurrency 16
+    python -m benchmarks.run --compare benchmarks/results/<baseline>.json
+
+Requests go through httpx's ASGI transport, so the numbers cover routing, validation, crud and
+serialization but not the network. SQL statement counts come from the engine instrumentation in
+app/database.py. Results are written as JSON under benchmarks/results/; --compare exits non-zero
+when a scenario's p95 or statements per request regress by more than --threshold.
+"""
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+from sqlalchemy import func, select
+from app import config
+from app.database import async_session, metrics, replica_metrics
+from app.main import app
+from app.models.model_base import Book
+from app.utils.cursor import encode_cursor
+from app.utils.enum import Genre
+from benchmarks.common import summarize
+from benchmarks.seed import ADJECTIVES, BENCH_PASSWORD, BENCH_USERNAME, FIRST_NAMES, NOUNS, generate_books, author_names
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+class Context:
+    def __init__(self, client, books, catalog_size, token, rng):
+        self.client = client
+        self.books = books
+        self.book_ids = [str(book_id) for book_id, _ in books]
+        self.catalog_size = catalog_size
+        self.token = token
+        self.rng = rng
+        self.authors = author_names(200)
+
+    @property
+    def auth(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+
+async def list_with_filters(ctx):
+    params = {"limit": 20, "sort_by": ctx.rng.choice(["title", "published_year"])}
+    choice = ctx.rng.random()
+    if choice < 0.3:
+        params["genre"] = ctx.rng.choice(list(Genre)).value
+    elif choice < 0.5:
+        params["title"] = ctx.rng.choice(NOUNS)
+    elif choice < 0.7:
+        params["author"] = ctx.rng.choice(FIRST_NAMES)
+    else:
+        year = ctx.rng.randint(1800, 2000)
+        params.update(year_from=year, year_to=year + 20)
+    return await ctx.client.get("/api/v1/books/", params=params)
+
+
+async def deep_offset_page(ctx):
+    skip = ctx.rng.randint(ctx.catalog_size // 2, max(ctx.catalog_size // 2, ctx.catalog_size - 20))
+    return await ctx.client.get("/api/v1/books/", params={"skip": skip, "limit": 20})
+
+
+async def deep_cursor_page(ctx):
+    # Resume after a random sampled book, i.e. at an arbitrary depth in title order.
+    book_id, title = ctx.rng.choice(ctx.books)
+    cursor = encode_cursor("title", title, book_id)
+    return await ctx.client.get("/api/v1/books/", params={"cursor": cursor, "limit": 20})
+
+
+async def search(ctx):
+    term = ctx.rng.choice([ctx.rng.choice(ADJECTIVES), ctx.rng.choice(NOUNS), ctx.rng.choice(ctx.authors)])
+    return await ctx.client.get("/api/v1/books/search/", params={"query": term, "limit": 20})
+
+
+async def get_by_id(ctx):
+    return await ctx.client.get(f"/api/v1/books/{ctx.rng.choice(ctx.book_ids)}")
+
+
+async def create(ctx):
+    book = next(generate_books(1, ctx.authors, 1.0, ctx.rng))
+    return await ctx.client.post("/api/v1/books/", json=book.model_dump(), headers=ctx.auth)
+
+
+async def bulk_upload(ctx):
+    books = [book.model_dump() for book in generate_books(100, ctx.authors, 1.0, ctx.rng)]
+    return await ctx.client.post("/api/v1/books/bulk-upload", json=books, headers=ctx.auth)
+
+
+async def login(ctx):
+    return await ctx.client.post("/auth/login", data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+
+
+SCENARIOS = {
+    "list_filters": list_with_filters,
+    "deep_offset_page": deep_offset_page,
+    "deep_cursor_page": deep_cursor_page,
+    "search": search,
+    "get_by_id": get_by_id,
+    "create": create,
+    "bulk_upload": bulk_upload,
+    "login": login,
+}
+
+
+async def run_scenario(ctx, scenario, requests, concurrency):
+    latencies, statuses = [], {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await scenario(ctx)
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    statements_before = statements()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    result = summarize(latencies)
+    result.update(
+        throughput_rps=requests / elapsed,
+        statements_per_request=(statements() - statements_before) / requests,
+        statuses={str(code): count for code, count in statuses.items()},
+    )
+    return result
+
+
+def statements() -> int:
+    # Reads are counted on the replica engine when one is configured.
+    return metrics.statements.value + (replica_metrics.statements.value if replica_metrics is not metrics else 0)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    async with async_session() as db:
+        catalog_size = (await db.execute(select(func.count()).select_from(Book))).scalar_one()
+        sample = select(Book.id, Book.title).order_by(func.random()).limit(1000)
+        books = [tuple(row) for row in (await db.execute(sample)).all()]
+    if not books:
+        raise SystemExit("The catalog is empty; run `python -m benchmarks.seed` first")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        response = await client.post("/auth/login", data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+        response.raise_for_status()
+        ctx = Context(client, books, catalog_size, response.json()["access_token"], random.Random(args.seed))
+        results = {}
+        for name in args.scenarios:
+            scenario = SCENARIOS[name]
+            requests = max(1, args.requests // 10) if name in ("bulk_upload", "login") else args.requests
+            await run_scenario(ctx, scenario, min(requests, args.warmup), args.concurrency)
+            results[name] = await run_scenario(ctx, scenario, requests, args.concurrency)
+            print(f"{name:>18}: p50 {results[name]['p50_ms']:.1f}ms  p95 {results[name]['p95_ms']:.1f}ms  "
+                  f"p99 {results[name]['p99_ms']:.1f}ms  {results[name]['throughput_rps']:.0f} req/s  "
+                  f"{results[name]['statements_per_request']:.1f} stmts/req")
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "catalog_size": catalog_size,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "cache_backend": config.CACHE_BACKEND,
+        "scenarios": results,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    name = f"{report['created_at'][:19].replace(':', '')}-{report['git_revision']}.json"
+    path = Path(args.output) if args.output else RESULTS_DIR / name
+    path.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {path}")
+    return report
+
+
+def compare(report, baseline_path, threshold):
+    baseline = json.loads(Path(baseline_path).read_text())
+    regressions = []
+    for name, current in report["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if not previous:
+            continue
+        for metric in ("p95_ms", "statements_per_request"):
+            if previous[metric] and current[metric] > previous[metric] * (1 + threshold):
+                regressions.append(f"{name}.{metric}: {previous[metric]:.2f} -> {current[metric]:.2f}")
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return not regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario (bulk_upload and login run a tenth)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>-<revision>.json)")
+    parser.add_argument("--compare", help="Baseline result file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression (default: 0.2)")
+    args = parser.parse_args()
+    report = asyncio.run(run(args))
+    if args.compare and not compare(report, args.compare, args.threshold):
+        raise SystemExit(1)
@@ -0,0 +1,29 @@
+"""add_book_keyset_indexes
+
+Revision ID: 3c9e4f2a7b81
+Revises: 1527a1ea0c08
+Create Date: 2026-10-18 10:12:04.518233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '3c9e4f2a7b81'
+down_revision: Union[str, Sequence[str], None] = '1527a1ea0c08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_books_title_id', 'books', ['title', 'id'])
+    op.create_index('ix_books_published_year_id', 'books', ['published_year', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_published_year_id', table_name='books')
+    op.drop_index('ix_books_title_id', table_name='books')
@@ -0,0 +1,78 @@
+"""bump_catalog_version_at_commit
+
+Revision ID: a3f6c1e8d297
+Revises: e5b19c7a3d40
+Create Date: 2026-10-18 19:42:10.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'a3f6c1e8d297'
+down_revision: Union[str, Sequence[str], None] = 'e5b19c7a3d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SLOTS = 64
+TABLES = ('books', 'book_authors', 'authors')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER {table}_bump_catalog_version ON {table}")
+    op.execute("DROP FUNCTION bump_catalog_version()")
+    # The catalog version is the sum of SLOTS counters. A transaction bumps the slot of its backend
+    # once, at commit, so concurrent writers neither queue on one row nor hold it while they work,
+    # and the new version becomes visible together with the rows that caused it.
+    op.drop_constraint('ck_catalog_state_single_row', 'catalog_state', type_='check')
+    op.execute(f"""
+        INSERT INTO catalog_state (id, version)
+        SELECT slot, 0 FROM generate_series(0, {SLOTS - 1}) AS slot
+        ON CONFLICT (id) DO NOTHING
+    """)
+    op.execute(f"""
+        CREATE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+        BEGIN
+            IF coalesce(current_setting('app.catalog_bumped', true), '') <> 'on' THEN
+                PERFORM set_config('app.catalog_bumped', 'on', true);
+                UPDATE catalog_state SET version = version + 1 WHERE id = pg_backend_pid() % {SLOTS};
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.execute(f"""
+            CREATE CONSTRAINT TRIGGER {table}_bump_catalog_version
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE FUNCTION bump_catalog_version()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER {table}_bump_catalog_version ON {table}")
+    op.execute("DROP FUNCTION bump_catalog_version()")
+    op.execute("UPDATE catalog_state SET version = (SELECT sum(version) FROM catalog_state) WHERE id = 1")
+    op.execute("DELETE FROM catalog_state WHERE id <> 1")
+    op.create_check_constraint('ck_catalog_state_single_row', 'catalog_state', 'id = 1')
+    op.execute("""
+        CREATE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE catalog_state SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_bump_catalog_version
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()
+        """)
@@ -0,0 +1,70 @@
+"""make_catalog_changes_opt_in
+
+Revision ID: b4e9d2a7c613
+Revises: f1b7c3e9a52d
+Create Date: 2026-10-18 23:48:02.316540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b4e9d2a7c613'
+down_revision: Union[str, Sequence[str], None] = 'f1b7c3e9a52d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Book id column per table, as in d8c2a5f71e04.
+TABLES = {'books': 'id', 'book_authors': 'book_id'}
+
+
+def _record(column: str, *rows: str) -> str:
+    changed = " UNION ".join(f"SELECT {column} FROM {table}" for table in rows)
+    return f"""
+        INSERT INTO catalog_changes (xid, book_id)
+        SELECT DISTINCT pg_current_xact_id()::text::bigint, {column} FROM ({changed}) AS changed;
+    """
+
+
+def _replace_trigger_function(table: str, column: str, guard: str) -> None:
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION {table}_catalog_changes() RETURNS trigger AS $$
+        BEGIN
+            {guard}
+            IF TG_OP = 'INSERT' THEN
+                {_record(column, 'new_rows')}
+            ELSIF TG_OP = 'DELETE' THEN
+                {_record(column, 'old_rows')}
+            ELSE
+                {_record(column, 'new_rows', 'old_rows')}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('catalog_changes_lease',
+    sa.Column('id', sa.SmallInteger(), nullable=False),
+    sa.Column('active_until', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Writes are logged only while a process with the catalog snapshot enabled keeps the lease; the
+    # statement runs after the row writes, so its fresh snapshot sees any lease committed before them.
+    for table, column in TABLES.items():
+        _replace_trigger_function(table, column, """
+            IF NOT EXISTS (SELECT 1 FROM catalog_changes_lease WHERE active_until > now()) THEN
+                RETURN NULL;
+            END IF;
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in TABLES.items():
+        _replace_trigger_function(table, column, '')
+    op.drop_table('catalog_changes_lease')
@@ -0,0 +1,53 @@
+"""add_book_versions_and_catalog_state
+
+Revision ID: b7e2d90a4c13
+Revises: 8d41b6e0c2f5
+Create Date: 2026-10-18 12:27:15.884530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'b7e2d90a4c13'
+down_revision: Union[str, Sequence[str], None] = '8d41b6e0c2f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.create_table('catalog_state',
+    sa.Column('id', sa.SmallInteger(), nullable=False),
+    sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+    sa.CheckConstraint('id = 1', name='ck_catalog_state_single_row'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO catalog_state (id, version) VALUES (1, 0)")
+    # Any statement touching the catalog bumps its version, whichever code path issued it.
+    op.execute("""
+        CREATE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+        BEGIN
+            UPDATE catalog_state SET version = version + 1 WHERE id = 1;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    for table in ('books', 'book_authors', 'authors'):
+        op.execute(f"""
+            CREATE TRIGGER {table}_bump_catalog_version
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('books', 'book_authors', 'authors'):
+        op.execute(f"DROP TRIGGER {table}_bump_catalog_version ON {table}")
+    op.execute("DROP FUNCTION bump_catalog_version()")
+    op.drop_table('catalog_state')
+    op.drop_column('books', 'version')
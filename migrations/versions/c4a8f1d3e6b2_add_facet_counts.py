@@ -0,0 +1,101 @@
+"""add_facet_counts
+
+Revision ID: c4a8f1d3e6b2
+Revises: b7e2d90a4c13
+Create Date: 2026-10-18 14:41:52.307618
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'c4a8f1d3e6b2'
+down_revision: Union[str, Sequence[str], None] = 'b7e2d90a4c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BOOK_FACETS = """
+    SELECT 'genre' AS facet, genre AS value, {sign} AS delta FROM {rows}, unnest({rows}.genres) AS genre
+    UNION ALL
+    SELECT 'decade', ((published_year / 10) * 10)::text, {sign} FROM {rows} WHERE published_year IS NOT NULL
+"""
+
+AUTHOR_FACETS = """
+    SELECT 'author' AS facet, author_id::text AS value, {sign} AS delta FROM {rows}
+"""
+
+
+def _apply_deltas(deltas: str) -> str:
+    # Rows are upserted in key order so concurrent writers lock counters in the same order.
+    return f"""
+        INSERT INTO facet_counts (facet, value, count)
+        SELECT facet, value, sum(delta) FROM ({deltas}) AS deltas
+        GROUP BY facet, value HAVING sum(delta) <> 0 ORDER BY facet, value
+        ON CONFLICT (facet, value) DO UPDATE SET count = facet_counts.count + excluded.count;
+    """
+
+
+def _create_trigger_function(name: str, facets: str) -> None:
+    op.execute(f"""
+        CREATE FUNCTION {name}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {_apply_deltas(facets.format(rows='new_rows', sign=1))}
+            ELSIF TG_OP = 'DELETE' THEN
+                {_apply_deltas(facets.format(rows='old_rows', sign=-1))}
+            ELSE
+                {_apply_deltas(facets.format(rows='new_rows', sign=1) + ' UNION ALL '
+                               + facets.format(rows='old_rows', sign=-1))}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def _create_triggers(table: str, function: str) -> None:
+    # Statement-level with transition tables: one aggregated upsert per statement, not per row.
+    op.execute(f"""
+        CREATE TRIGGER {table}_facets_insert AFTER INSERT ON {table}
+        REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+    """)
+    op.execute(f"""
+        CREATE TRIGGER {table}_facets_delete AFTER DELETE ON {table}
+        REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+    """)
+    op.execute(f"""
+        CREATE TRIGGER {table}_facets_update AFTER UPDATE ON {table}
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {function}()
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_books_genres_gin', 'books', ['genres'], postgresql_using='gin')
+    op.create_table('facet_counts',
+    sa.Column('facet', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('count', sa.BigInteger(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('facet', 'value')
+    )
+    op.create_index('ix_facet_counts_facet_count', 'facet_counts', ['facet', sa.text('count DESC')])
+    op.execute(_apply_deltas(BOOK_FACETS.format(rows='books', sign=1)))
+    op.execute(_apply_deltas(AUTHOR_FACETS.format(rows='book_authors', sign=1)))
+    _create_trigger_function('books_facet_counts', BOOK_FACETS)
+    _create_trigger_function('book_authors_facet_counts', AUTHOR_FACETS)
+    _create_triggers('books', 'books_facet_counts')
+    _create_triggers('book_authors', 'book_authors_facet_counts')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('books', 'book_authors'):
+        for event in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER {table}_facets_{event} ON {table}")
+    op.execute("DROP FUNCTION book_authors_facet_counts()")
+    op.execute("DROP FUNCTION books_facet_counts()")
+    op.drop_index('ix_facet_counts_facet_count', table_name='facet_counts')
+    op.drop_table('facet_counts')
+    op.drop_index('ix_books_genres_gin', table_name='books')
@@ -0,0 +1,79 @@
+"""add_catalog_changes
+
+Revision ID: d8c2a5f71e04
+Revises: a3f6c1e8d297
+Create Date: 2026-10-18 21:14:37.092618
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'd8c2a5f71e04'
+down_revision: Union[str, Sequence[str], None] = 'a3f6c1e8d297'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Book id column per table; pg_current_xact_id() is stored as bigint so no custom type is needed.
+TABLES = {'books': 'id', 'book_authors': 'book_id'}
+
+
+def _record(column: str, *rows: str) -> str:
+    changed = " UNION ".join(f"SELECT {column} FROM {table}" for table in rows)
+    return f"""
+        INSERT INTO catalog_changes (xid, book_id)
+        SELECT DISTINCT pg_current_xact_id()::text::bigint, {column} FROM ({changed}) AS changed;
+    """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('catalog_changes',
+    sa.Column('xid', sa.BigInteger(), nullable=False),
+    sa.Column('book_id', sa.UUID(), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False)
+    )
+    op.create_index('ix_catalog_changes_xid', 'catalog_changes', ['xid'])
+    op.create_index('ix_catalog_changes_changed_at', 'catalog_changes', ['changed_at'])
+    # Append-only: one multi-row insert per statement, no counter rows for writers to queue on.
+    for table, column in TABLES.items():
+        op.execute(f"""
+            CREATE FUNCTION {table}_catalog_changes() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    {_record(column, 'new_rows')}
+                ELSIF TG_OP = 'DELETE' THEN
+                    {_record(column, 'old_rows')}
+                ELSE
+                    {_record(column, 'new_rows', 'old_rows')}
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_catalog_changes_insert AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION {table}_catalog_changes()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_catalog_changes_delete AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION {table}_catalog_changes()
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_catalog_changes_update AFTER UPDATE ON {table}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {table}_catalog_changes()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        for event in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER {table}_catalog_changes_{event} ON {table}")
+        op.execute(f"DROP FUNCTION {table}_catalog_changes()")
+    op.drop_index('ix_catalog_changes_changed_at', table_name='catalog_changes')
+    op.drop_index('ix_catalog_changes_xid', table_name='catalog_changes')
+    op.drop_table('catalog_changes')
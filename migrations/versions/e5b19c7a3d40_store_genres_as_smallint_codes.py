@@ -0,0 +1,113 @@
+"""store_genres_as_smallint_codes
+
+Revision ID: e5b19c7a3d40
+Revises: c4a8f1d3e6b2
+Create Date: 2026-10-18 16:05:48.219374
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'e5b19c7a3d40'
+down_revision: Union[str, Sequence[str], None] = 'c4a8f1d3e6b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.utils.enum.GENRE_CODES at the time of this migration.
+GENRE_CODES = (
+    ('Fiction', 1), ('Non-Fiction', 2), ('Science', 3), ('Fantasy', 4), ('Biography', 5),
+    ('Mystery', 6), ('Thriller', 7), ('Romance', 8), ('Historical', 9), ('Adventure', 10),
+    ('Horror', 11), ('Science Fiction', 12), ('Dystopian', 13), ('Memoir', 14), ('Self-Help', 15),
+)
+
+BOOK_FACETS = """
+    SELECT 'genre' AS facet, {genre} AS value, {sign} AS delta FROM {rows}, unnest({rows}.genres) AS genre
+    UNION ALL
+    SELECT 'decade', ((published_year / 10) * 10)::text, {sign} FROM {rows} WHERE published_year IS NOT NULL
+"""
+
+
+def _apply_deltas(deltas: str) -> str:
+    return f"""
+        INSERT INTO facet_counts (facet, value, count)
+        SELECT facet, value, sum(delta) FROM ({deltas}) AS deltas
+        GROUP BY facet, value HAVING sum(delta) <> 0 ORDER BY facet, value
+        ON CONFLICT (facet, value) DO UPDATE SET count = facet_counts.count + excluded.count;
+    """
+
+
+def _replace_books_facet_counts(genre: str) -> None:
+    facets = BOOK_FACETS.replace('{genre}', genre)
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION books_facet_counts() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {_apply_deltas(facets.format(rows='new_rows', sign=1))}
+            ELSIF TG_OP = 'DELETE' THEN
+                {_apply_deltas(facets.format(rows='old_rows', sign=-1))}
+            ELSE
+                {_apply_deltas(facets.format(rows='new_rows', sign=1) + ' UNION ALL '
+                               + facets.format(rows='old_rows', sign=-1))}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def _create_conversion(name: str, from_type: str, to_type: str, pairs) -> None:
+    # ALTER COLUMN ... USING cannot hold a subquery, so each element goes through a throwaway
+    # function that fails on values outside the mapping instead of dropping them.
+    cases = " ".join(f"WHEN {source} THEN {target}" for source, target in pairs)
+    op.execute(f"""
+        CREATE FUNCTION {name}(items {from_type}[]) RETURNS {to_type}[] AS $$
+        DECLARE
+            item {from_type};
+            converted {to_type}[] := '{{}}';
+        BEGIN
+            FOREACH item IN ARRAY items LOOP
+                IF (CASE item {cases} END) IS NULL THEN
+                    RAISE EXCEPTION 'Cannot convert genre %', item;
+                END IF;
+                converted := converted || (CASE item {cases} END);
+            END LOOP;
+            RETURN converted;
+        END;
+        $$ LANGUAGE plpgsql IMMUTABLE
+    """)
+
+
+def _codes_values() -> str:
+    return ", ".join(f"('{name}', {code})" for name, code in GENRE_CODES)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _create_conversion('genre_names_to_codes', 'text', 'smallint',
+                       [(f"'{name}'", f"{code}::smallint") for name, code in GENRE_CODES])
+    # Rewrites the table and rebuilds ix_books_genres_gin; row triggers do not fire.
+    op.execute("ALTER TABLE books ALTER COLUMN genres TYPE smallint[] USING genre_names_to_codes(genres::text[])")
+    op.execute("DROP FUNCTION genre_names_to_codes(text[])")
+    op.execute(f"""
+        UPDATE facet_counts SET value = codes.code::text
+        FROM (VALUES {_codes_values()}) AS codes(name, code)
+        WHERE facet_counts.facet = 'genre' AND facet_counts.value = codes.name
+    """)
+    _replace_books_facet_counts('genre::text')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _create_conversion('genre_codes_to_names', 'smallint', 'text',
+                       [(str(code), f"'{name}'") for name, code in GENRE_CODES])
+    op.execute("ALTER TABLE books ALTER COLUMN genres TYPE varchar[] USING genre_codes_to_names(genres)")
+    op.execute("DROP FUNCTION genre_codes_to_names(smallint[])")
+    op.execute(f"""
+        UPDATE facet_counts SET value = codes.name
+        FROM (VALUES {_codes_values()}) AS codes(name, code)
+        WHERE facet_counts.facet = 'genre' AND facet_counts.value = codes.code::text
+    """)
+    _replace_books_facet_counts('genre')
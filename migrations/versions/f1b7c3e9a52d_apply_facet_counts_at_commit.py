@@ -0,0 +1,129 @@
+"""apply_facet_counts_at_commit
+
+Revision ID: f1b7c3e9a52d
+Revises: d8c2a5f71e04
+Create Date: 2026-10-18 23:06:15.480217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = 'f1b7c3e9a52d'
+down_revision: Union[str, Sequence[str], None] = 'd8c2a5f71e04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SLOTS = 64
+
+BOOK_FACETS = """
+    SELECT 'genre' AS facet, genre::text AS value, {sign} AS delta FROM {rows}, unnest({rows}.genres) AS genre
+    UNION ALL
+    SELECT 'decade', ((published_year / 10) * 10)::text, {sign} FROM {rows} WHERE published_year IS NOT NULL
+"""
+
+AUTHOR_FACETS = """
+    SELECT 'author' AS facet, author_id::text AS value, {sign} AS delta FROM {rows}
+"""
+
+
+def _record_deltas(deltas: str) -> str:
+    # Append-only: takes no lock on facet_counts, so statements of one transaction cannot lock
+    # counters in an order another transaction's statements contradict.
+    return f"""
+        INSERT INTO facet_deltas (xid, facet, value, delta)
+        SELECT pg_current_xact_id()::text::bigint, facet, value, sum(delta) FROM ({deltas}) AS deltas
+        GROUP BY facet, value HAVING sum(delta) <> 0;
+    """
+
+
+def _apply_deltas(deltas: str) -> str:
+    # The statement-level upsert the facet_counts triggers ran before this revision.
+    return f"""
+        INSERT INTO facet_counts (facet, value, count)
+        SELECT facet, value, sum(delta) FROM ({deltas}) AS deltas
+        GROUP BY facet, value HAVING sum(delta) <> 0 ORDER BY facet, value
+        ON CONFLICT (facet, value) DO UPDATE SET count = facet_counts.count + excluded.count;
+    """
+
+
+def _replace_trigger_function(name: str, facets: str, statement) -> None:
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {statement(facets.format(rows='new_rows', sign=1))}
+            ELSIF TG_OP = 'DELETE' THEN
+                {statement(facets.format(rows='old_rows', sign=-1))}
+            ELSE
+                {statement(facets.format(rows='new_rows', sign=1) + ' UNION ALL '
+                           + facets.format(rows='old_rows', sign=-1))}
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('facet_deltas',
+    sa.Column('xid', sa.BigInteger(), nullable=False),
+    sa.Column('facet', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('delta', sa.BigInteger(), nullable=False)
+    )
+    op.create_index('ix_facet_deltas_xid', 'facet_deltas', ['xid'])
+    # SLOTS counters per facet value, summed on read; a transaction only touches the slot of its backend.
+    op.add_column('facet_counts', sa.Column('slot', sa.SmallInteger(), server_default='0', nullable=False))
+    op.drop_index('ix_facet_counts_facet_count', table_name='facet_counts')
+    op.drop_constraint('facet_counts_pkey', 'facet_counts', type_='primary')
+    op.create_primary_key('facet_counts_pkey', 'facet_counts', ['facet', 'value', 'slot'])
+    _replace_trigger_function('books_facet_counts', BOOK_FACETS, _record_deltas)
+    _replace_trigger_function('book_authors_facet_counts', AUTHOR_FACETS, _record_deltas)
+    # At commit, the first deferred event folds all of the transaction's deltas into its slot in one
+    # upsert in key order: counter locks are taken in one global order and held only while committing.
+    op.execute(f"""
+        CREATE FUNCTION apply_facet_deltas() RETURNS trigger AS $$
+        BEGIN
+            IF coalesce(current_setting('app.facets_applied', true), '') <> 'on' THEN
+                PERFORM set_config('app.facets_applied', 'on', true);
+                WITH applied AS (
+                    DELETE FROM facet_deltas WHERE xid = pg_current_xact_id()::text::bigint
+                    RETURNING facet, value, delta
+                )
+                INSERT INTO facet_counts (facet, value, slot, count)
+                SELECT facet, value, pg_backend_pid() % {SLOTS}, sum(delta) FROM applied
+                GROUP BY facet, value HAVING sum(delta) <> 0 ORDER BY facet, value
+                ON CONFLICT (facet, value, slot) DO UPDATE SET count = facet_counts.count + excluded.count;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE CONSTRAINT TRIGGER facet_deltas_apply AFTER INSERT ON facet_deltas
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION apply_facet_deltas()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER facet_deltas_apply ON facet_deltas")
+    op.execute("DROP FUNCTION apply_facet_deltas()")
+    _replace_trigger_function('books_facet_counts', BOOK_FACETS, _apply_deltas)
+    _replace_trigger_function('book_authors_facet_counts', AUTHOR_FACETS, _apply_deltas)
+    op.execute("""
+        WITH slots AS (DELETE FROM facet_counts RETURNING facet, value, count)
+        INSERT INTO facet_counts (facet, value, slot, count)
+        SELECT facet, value, 0, sum(count) FROM slots GROUP BY facet, value
+    """)
+    op.drop_constraint('facet_counts_pkey', 'facet_counts', type_='primary')
+    op.create_primary_key('facet_counts_pkey', 'facet_counts', ['facet', 'value'])
+    op.drop_column('facet_counts', 'slot')
+    op.create_index('ix_facet_counts_facet_count', 'facet_counts', ['facet', sa.text('count DESC')])
+    op.drop_index('ix_facet_deltas_xid', table_name='facet_deltas')
+    op.drop_table('facet_deltas')
@@ -0,0 +1,60 @@
+import os
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TEST_DATABASE_REPLICA_URL = os.getenv("TEST_DATABASE_REPLICA_URL")
+
+# app.config reads the environment at import time, so defaults are set before any app import.
+# Tests that need Postgres run against TEST_DATABASE_URL, which they migrate and truncate.
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://unused@localhost/unused")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ["CACHE_BACKEND"] = "none"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+CATALOG_TABLES = ("books, authors, book_authors, facet_counts, facet_deltas, catalog_changes, catalog_changes_lease, "
+                  "users")
+
+
+def migrate(url: str):
+    from alembic import command
+    from alembic.config import Config
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "migrations"))
+    # migrations/env.py takes the URL from the environment.
+    primary = os.environ["DATABASE_URL"]
+    os.environ["DATABASE_URL"] = url
+    try:
+        command.upgrade(config, "head")
+    finally:
+        os.environ["DATABASE_URL"] = primary
+
+
+@pytest.fixture(scope="session")
+def migrated_database():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    migrate(TEST_DATABASE_URL)
+
+
+@pytest.fixture
+async def db(migrated_database):
+    from sqlalchemy import text
+    from app.crud.author import author_resolver
+    from app.database import async_session, engine
+    author_resolver._cache.clear()
+    async with async_session() as session:
+        # TRUNCATE fires no row or statement triggers, so facet_counts is emptied with the catalog.
+        await session.execute(text(f"TRUNCATE {CATALOG_TABLES}"))
+        await session.commit()
+        yield session
+    # Connections belong to the test's event loop.
+    await engine.dispose()
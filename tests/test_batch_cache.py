@@ -0,0 +1,52 @@
+import json
+import uuid
+import pytest
+from sqlalchemy import text
+from app.crud import book as book_crud
+from app.schemas.book import BookCreate
+from app.utils.cache import MemoryCache, book_key
+
+pytestmark = pytest.mark.anyio
+
+
+class SerializingCache(MemoryCache):
+    # Stores values the way a networked backend would hand them back: through JSON.
+    async def get(self, key):
+        value = await super().get(key)
+        return None if value is None else json.loads(value)
+
+    async def set(self, key, value, ttl=None):
+        await super().set(key, json.dumps(value, default=str), ttl)
+
+
+async def test_cached_books_match_uuid_ids(monkeypatch):
+    cache = SerializingCache()
+    monkeypatch.setattr(book_crud, "cache", cache)
+    ids = [uuid.uuid4(), uuid.uuid4()]
+    for book_id in ids:
+        await cache.set(book_key(book_id), {"id": book_id, "title": f"Book {book_id}", "version": 1})
+    # Every id is a cache hit, so no session is needed.
+    books, missing = await book_crud.get_books_by_ids(None, list(reversed(ids)))
+    assert [book["id"] for book in books] == [str(book_id) for book_id in reversed(ids)]
+    assert missing == []
+
+
+async def test_single_book_entry_follows_the_book_version(db, monkeypatch):
+    cache = MemoryCache()
+    monkeypatch.setattr(book_crud, "cache", cache)
+    book = await book_crud.create_book(db, BookCreate(title="Before", published_year=2001, genres=["Fiction"],
+                                                      author_names=["Cached Author"]))
+    book_id = str(book.id)
+    cached = await book_crud.get_book_data(db, book_id)
+    # A write through another worker leaves this worker's entry in place.
+    await db.execute(text("UPDATE books SET title = 'After', version = version + 1 WHERE id = :id"), {"id": book_id})
+    await db.commit()
+    db.expunge_all()
+    version = await book_crud.get_book_version(db, book_id)
+    assert version == cached["version"] + 1
+
+    assert (await book_crud.get_book_data(db, book_id, version))["title"] == "After"
+    assert (await cache.get(book_key(book_id)))["version"] == version
+    # A reader that saw the older version (a lagging replica) does not put it back.
+    await book_crud.get_book_data(db, book_id, cached["version"])
+    assert (await cache.get(book_key(book_id)))["version"] == version
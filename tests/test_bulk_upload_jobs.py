@@ -0,0 +1,49 @@
+import json
+from collections import OrderedDict
+import pytest
+from app.jobs import bulk_upload
+from app.jobs.queue import LocalJobQueue
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def empty_queue(monkeypatch):
+    monkeypatch.setattr(bulk_upload, "jobs", OrderedDict())
+    monkeypatch.setattr(bulk_upload, "queue", LocalJobQueue())
+
+
+async def body(records, size: int = 5):
+    data = json.dumps(records).encode()
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def test_body_is_spooled_not_kept():
+    records = [{"title": f"Book {i}", "author_names": ["Ada"]} for i in range(3)]
+    job = await bulk_upload.submit(body(records), "owner")
+    assert job.total == 3
+    assert [json.loads(line) for line in job.records] == records
+    job.records.close()
+
+
+async def test_full_queue_is_busy():
+    for _ in range(2):
+        await bulk_upload.submit(body([{}]), "owner", max_queued=2)
+    with pytest.raises(bulk_upload.BulkUploadBusy):
+        await bulk_upload.submit(body([{}]), "owner", max_queued=2)
+
+
+async def test_pending_records_are_bounded():
+    await bulk_upload.submit(body([{}] * 3), "owner", max_records=4)
+    with pytest.raises(bulk_upload.BulkUploadBusy):
+        await bulk_upload.submit(body([{}] * 2), "owner", max_records=4)
+    with pytest.raises(bulk_upload.BulkUploadTooLarge):
+        await bulk_upload.submit(body([{}] * 5), "owner", max_records=4)
+    assert len(bulk_upload.jobs) == 1
+
+
+async def test_non_array_body_is_rejected():
+    with pytest.raises(ValueError):
+        await bulk_upload.submit(body({"title": "Not a list"}), "owner")
+    assert not bulk_upload.jobs
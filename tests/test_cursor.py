@@ -0,0 +1,28 @@
+import uuid
+import pytest
+from app.utils.cursor import decode_cursor, encode_cursor
+
+BOOK_ID = uuid.UUID("00000000-0000-0000-0000-000000000001")
+
+
+@pytest.mark.parametrize("sort_by, value", [("title", "Dune"), ("published_year", 1965), ("published_year", None)])
+def test_round_trip(sort_by, value):
+    assert decode_cursor(encode_cursor(sort_by, value, BOOK_ID), sort_by) == (value, BOOK_ID)
+
+
+@pytest.mark.parametrize("sort_by, value", [("title", 5), ("title", None), ("published_year", "1965"),
+                                            ("published_year", True), ("published_year", 1.5)])
+def test_wrong_value_type(sort_by, value):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(sort_by, value, BOOK_ID), sort_by)
+
+
+def test_other_sort_order():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor("title", "Dune", BOOK_ID), "published_year")
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24", encode_cursor("title", "Dune", BOOK_ID)[:-4]])
+def test_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, "title")
@@ -0,0 +1,47 @@
+import uuid
+import anyio
+import pytest
+from sqlalchemy import delete, insert
+from app.crud import book as book_crud
+from app.database import async_session
+from app.models.model_base import Book, book_authors
+from app.schemas.book import BookCreate
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_and_delete_for_the_same_author_do_not_deadlock(db):
+    existing = await book_crud.create_book(db, BookCreate(title="Old", published_year=2001, genres=["Fiction"],
+                                                          author_names=["Popular Author"]))
+    author_id = existing.authors[0].id
+    new_id = uuid.uuid4()
+    async with async_session() as creating, async_session() as deleting:
+        with anyio.fail_after(10):
+            # create_book's order: book row (genre and decade counters), then links (author counter).
+            await creating.execute(insert(Book).values(id=new_id, title="New", published_year=2005,
+                                                       genres=["Fiction"]))
+            # delete_book's order: links first, then the book row.
+            await deleting.execute(delete(book_authors).where(book_authors.c.book_id == existing.id))
+            await creating.execute(insert(book_authors).values(book_id=new_id, author_id=author_id))
+            await deleting.execute(delete(Book).where(Book.id == existing.id))
+            await deleting.commit()
+            await creating.commit()
+
+    facets = await book_crud._precomputed_facets(db, 10)
+    assert facets["genres"]["Fiction"] == 1
+    assert facets["decades"] == {"2000": 1}
+    assert facets["authors"] == [{"name": "Popular Author", "count": 1}]
+
+
+async def test_precomputed_facets_match_the_books(db):
+    for i in range(6):
+        await book_crud.create_book(db, BookCreate(title=f"Book {i}", published_year=1990 + 5 * i,
+                                                   genres=["Fiction", "Mystery"][:1 + i % 2],
+                                                   author_names=[f"Author {i % 3}"]))
+    books = await book_crud.get_books(db, limit=100)
+    await book_crud.delete_book(db, str(books[0]["id"]))
+    # Writes from several connections land in different slots.
+    async with async_session() as other:
+        await book_crud.ingest_chunk(other, [BookCreate(title="Bulk", published_year=2024, genres=["Horror"],
+                                                        author_names=["Author 0"])])
+    assert await book_crud._precomputed_facets(db, 10) == await book_crud._filtered_facets(db, 10)
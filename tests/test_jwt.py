@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+import pytest
+from app.utils import jwt as jwt_utils
+
+ALGORITHMS = ["HS256", "HS384", "HS512"]
+CLAIMS = [
+    {"sub": "reader"},
+    {"sub": "Zoë 読書家  ", "scope": ["books:write"], "n": 1.5},
+]
+
+
+@pytest.fixture(params=ALGORITHMS)
+def algorithm(request, monkeypatch):
+    monkeypatch.setattr(jwt_utils, "JWT_ALGORITHM", request.param)
+    return request.param
+
+
+def with_exp(claims: dict, minutes: int = 30) -> dict:
+    return dict(claims, exp=datetime.utcnow() + timedelta(minutes=minutes))
+
+
+@pytest.mark.parametrize("claims", CLAIMS)
+def test_hmac_tokens_match_jose_byte_for_byte(algorithm, claims):
+    claims = with_exp(claims)
+    token = jwt_utils._hmac_encode(claims)
+    assert token == jwt_utils._jose_encode(claims)
+    assert jwt_utils._jose_decode(token) == jwt_utils._hmac_decode(token)
+
+
+@pytest.mark.parametrize("claims", CLAIMS)
+def test_backends_verify_each_others_tokens(algorithm, claims):
+    claims = with_exp(claims)
+    assert jwt_utils._hmac_decode(jwt_utils._jose_encode(claims))["sub"] == claims["sub"]
+    assert jwt_utils._jose_decode(jwt_utils._hmac_encode(claims))["sub"] == claims["sub"]
+
+
+def test_backends_reject_the_same_tokens(algorithm):
+    expired = jwt_utils._jose_encode(with_exp(CLAIMS[0], minutes=-1))
+    header, payload, signature = jwt_utils._jose_encode(with_exp(CLAIMS[0])).split(".")
+    tampered = ".".join((header, payload, signature[:-2] + ("AA" if signature[-2:] != "AA" else "BB")))
+    unsigned = ".".join((jwt_utils._b64encode(b'{"alg":"none","typ":"JWT"}').decode(), payload, ""))
+    for token in (expired, tampered, unsigned, "not-a-token", ""):
+        assert jwt_utils._jose_decode(token) is None
+        assert jwt_utils._hmac_decode(token) is None
@@ -0,0 +1,9 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+def test_listing_limit_is_bounded():
+    # Rejected before any query runs, so no database is needed.
+    client = TestClient(app)
+    assert client.get("/api/v1/books/", params={"limit": 101}).status_code == 422
+    assert client.get("/api/v1/books/search/", params={"query": "x", "limit": 101}).status_code == 422
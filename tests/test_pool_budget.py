@@ -0,0 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
+import pytest
+from app.config import DB_MAX_OVERFLOW, DB_POOL_SIZE
+from app.crud import author as author_module
+from app.crud.author import AuthorResolver
+from app.main import background_connections
+from app.middleware.admission import check_pool_budget, parse_limits
+
+pytestmark = pytest.mark.anyio
+
+
+def test_defaults_leave_the_point_reserve():
+    assert check_pool_budget(DB_POOL_SIZE + DB_MAX_OVERFLOW, background_connections()) >= 3
+
+
+def test_budgets_over_the_pool_fail_startup():
+    gates = parse_limits("point=16/64/250,list=8/32/1000,write=4/32/2000")
+    assert check_pool_budget(16, 2, gates, reserve=2) == 2
+    with pytest.raises(ValueError, match="leaving 1 to point reads"):
+        check_pool_budget(15, 2, gates, reserve=2)
+
+
+async def test_resolver_flushes_share_their_connection_slots(monkeypatch):
+    active = peak = 0
+
+    class Session:
+        async def commit(self):
+            pass
+
+    @asynccontextmanager
+    async def session():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        try:
+            yield Session()
+        finally:
+            active -= 1
+
+    async def lookup_or_create_authors(db, names):
+        await asyncio.sleep(0.01)
+        return {name: name for name in names}, 0
+
+    monkeypatch.setattr(author_module, "lookup_or_create_authors", lookup_or_create_authors)
+    resolver = AuthorResolver(session_factory=session, window=0, concurrency=1)
+    results = await asyncio.gather(*(resolver._lookup_or_create([f"Author {i}"]) for i in range(5)))
+    assert results == [{f"Author {i}": f"Author {i}"} for i in range(5)]
+    assert peak == 1
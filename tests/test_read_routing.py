@@ -0,0 +1,115 @@
+"""Read routing between the primary and a replica.
+
+The replica tests need a second database in TEST_DATABASE_REPLICA_URL. It stands in for a replica
+that never catches up: nothing is replicated to it, so a book written through the API is found
+only by reads routed to the primary, unless a test copies it over. Most tests run with
+CACHE_BACKEND=none; the cache test swaps in a memory cache.
+"""
+import uuid
+import anyio
+import httpx
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app import dependencies
+from app.config import DATABASE_REPLICA_URL
+from app.crud import book as book_crud
+from app.database import create_engine, read_session
+from app.main import app
+from app.models.model_base import Author, Book, book_authors
+from app.utils import cache as cache_module, read_your_writes
+from app.utils.cache import MemoryCache
+from app.utils.jwt import create_access_token
+from tests.conftest import CATALOG_TABLES, TEST_DATABASE_REPLICA_URL, migrate
+
+pytestmark = pytest.mark.anyio
+
+BOOK = {"title": "Routed", "published_year": 2001, "genres": ["Fiction"], "author_names": ["Ada"]}
+
+
+def bearer(subject: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': subject})}"}
+
+
+@pytest.mark.skipif(bool(DATABASE_REPLICA_URL), reason="DATABASE_REPLICA_URL is set")
+async def test_reads_fall_back_to_read_only_primary(db):
+    async with read_session() as session:
+        assert (await session.execute(text("SELECT 1"))).scalar_one() == 1
+        with pytest.raises(DBAPIError, match="read-only"):
+            await session.execute(text("INSERT INTO authors (id, name) VALUES (:id, 'Nobody')"),
+                                  {"id": uuid.uuid4()})
+
+
+@pytest.fixture(scope="session")
+def migrated_replica(migrated_database):
+    if not TEST_DATABASE_REPLICA_URL:
+        pytest.skip("TEST_DATABASE_REPLICA_URL is not set")
+    migrate(TEST_DATABASE_REPLICA_URL)
+
+
+@pytest.fixture
+async def replica(migrated_replica):
+    engine = create_engine(TEST_DATABASE_REPLICA_URL)
+    async with engine.begin() as connection:
+        await connection.execute(text(f"TRUNCATE {CATALOG_TABLES}"))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def client(db, replica, monkeypatch):
+    monkeypatch.setattr(dependencies, "read_session", async_sessionmaker(
+        replica.execution_options(postgresql_readonly=True), expire_on_commit=False, class_=AsyncSession))
+    monkeypatch.setattr(read_your_writes, "_recent_writers", {})
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_writer_reads_from_primary_within_window(client, monkeypatch):
+    monkeypatch.setattr(read_your_writes, "READ_YOUR_WRITES_SECONDS", 1)
+    created = await client.post("/api/v1/books/", json=BOOK, headers=bearer("writer"))
+    assert created.status_code == 201
+    path = f"/api/v1/books/{created.json()['id']}"
+
+    assert (await client.get(path, headers=bearer("writer"))).status_code == 200
+    # Anonymous readers and other users read the replica, which has not seen the book.
+    assert (await client.get(path)).status_code == 404
+    assert (await client.get(path, headers=bearer("someone else"))).status_code == 404
+
+    await anyio.sleep(1.2)
+    assert (await client.get(path, headers=bearer("writer"))).status_code == 404
+
+
+async def test_window_is_per_process(client):
+    # The window lives in this process' memory; another worker would not know about the write.
+    created = await client.post("/api/v1/books/", json=BOOK, headers=bearer("writer"))
+    read_your_writes._recent_writers.clear()
+    assert (await client.get(f"/api/v1/books/{created.json()['id']}", headers=bearer("writer"))).status_code == 404
+
+
+async def test_cached_replica_reads_are_not_served_to_the_writer(client, replica, monkeypatch):
+    memory = MemoryCache()
+    monkeypatch.setattr(cache_module, "cache", memory)
+    monkeypatch.setattr(book_crud, "cache", memory)
+    monkeypatch.setattr(cache_module, "_observed_catalog_version", None)
+    created = (await client.post("/api/v1/books/", json=BOOK, headers=bearer("writer"))).json()
+    # The replica has caught up with the create, but not with the update below.
+    async with replica.begin() as connection:
+        author_id = uuid.uuid4()
+        await connection.execute(insert(Author).values(id=author_id, name="Ada"))
+        await connection.execute(insert(Book).values(id=created["id"], title=BOOK["title"], genres=BOOK["genres"],
+                                                     published_year=BOOK["published_year"], version=1))
+        await connection.execute(insert(book_authors).values(book_id=created["id"], author_id=author_id))
+    path = f"/api/v1/books/{created['id']}"
+    assert (await client.put(path, json={"title": "Updated"}, headers=bearer("writer"))).status_code == 200
+
+    # Anonymous reads fill the cache from the replica inside the window...
+    assert (await client.get(path)).json()["title"] == BOOK["title"]
+    anonymous = await client.get("/api/v1/books/")
+    assert [book["title"] for book in anonymous.json()] == [BOOK["title"]]
+    # ...and the writer, routed to the primary, still gets its own write.
+    assert (await client.get(path, headers=bearer("writer"))).json()["title"] == "Updated"
+    listing = await client.get("/api/v1/books/", headers=bearer("writer"))
+    assert [book["title"] for book in listing.json()] == ["Updated"]
+    assert listing.headers["ETag"] != anonymous.headers["ETag"]
@@ -0,0 +1,32 @@
+import random
+import uuid
+from fastapi.encoders import jsonable_encoder
+from app.schemas.book import BookResponse
+from app.utils.enum import Genre
+from app.utils.responses import JSONResponse, ORJSONResponse
+
+TEXT = ["plain", "Zoë", "読書", "emoji 📚", "line\u2028separator", "quote \" and \\", "tab\tnew\nline", "\x00\x1f", ""]
+
+
+def random_rows(rng: random.Random, count: int) -> list:
+    return [{
+        "id": uuid.UUID(int=rng.getrandbits(128)),
+        "title": " ".join(rng.choice(TEXT) for _ in range(3)) or "x",
+        "published_year": rng.randint(1800, 2020),
+        "genres": rng.sample([genre.value for genre in Genre], k=rng.randint(1, 3)),
+        "authors": [rng.choice(TEXT) for _ in range(rng.randint(0, 3))],
+    } for _ in range(count)]
+
+
+def test_orjson_listing_matches_json_response():
+    # Listing and search returned these dicts through jsonable_encoder before the fast path.
+    rows = random_rows(random.Random(7), 500)
+    assert ORJSONResponse(rows).body == JSONResponse(jsonable_encoder(rows)).body
+
+
+def test_orjson_bulk_upload_matches_validated_response():
+    # Bulk upload had response_model=List[BookResponse]; its dicts follow that field order.
+    rows = [{key: row[key] for key in ("title", "published_year", "genres", "id", "authors")}
+            for row in random_rows(random.Random(11), 500)]
+    validated = jsonable_encoder([BookResponse(**row) for row in rows])
+    assert ORJSONResponse(rows).body == JSONResponse(validated).body
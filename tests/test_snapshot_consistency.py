@@ -0,0 +1,206 @@
+import random
+import uuid
+import pytest
+from sqlalchemy import text
+from app.crud import book as book_crud
+from app.crud.snapshot import (NO_YEAR, CatalogColumns, _apply_changes, _fold, _load_changes, _load_columns,
+                               _renew_change_log)
+from app.schemas.book import BookCreate, BookUpdate
+from app.utils.cursor import decode_cursor
+from app.utils.enum import Genre
+
+pytestmark = pytest.mark.anyio
+
+WORDS = ["Silent", "Crimson", "Hidden", "Golden", "River", "Empire", "Garden", "Machine"]
+AUTHORS = ["Ada Abbott", "Boris Bauer", "Chen Costa", "Dana Diallo", "Emeka Eriksen", "Farah Fischer"]
+GENRES = [genre.value for genre in Genre]
+
+
+def random_filters(rng: random.Random) -> dict:
+    filters = {}
+    if rng.random() < 0.3:
+        word = rng.choice(WORDS)
+        filters["title"] = rng.choice([word, word[1:4].lower(), f"{word} 1"])
+    if rng.random() < 0.3:
+        filters["author"] = rng.choice([rng.choice(AUTHORS).split()[0], rng.choice(AUTHORS).split()[1].upper(), "zz"])
+    if rng.random() < 0.4:
+        filters["genre"] = ",".join(rng.sample(GENRES, k=rng.randint(1, 2)))
+    if rng.random() < 0.4:
+        filters["year_from"] = rng.randint(1900, 2000)
+    if rng.random() < 0.4:
+        filters["year_to"] = rng.randint(filters.get("year_from", 1900), 2020)
+    return filters
+
+
+def normalized(books):
+    # array_agg() does not promise an author order.
+    return [dict(book, authors=sorted(book["authors"])) for book in books]
+
+
+def rows(columns: CatalogColumns):
+    return normalized(columns._row(position) for position in range(len(columns)))
+
+
+def year_ids(columns: CatalogColumns):
+    return [columns._row(position)["id"] for position in columns.year_order]
+
+
+def random_book(rng: random.Random, i: int) -> BookCreate:
+    return BookCreate(title=f"The {rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                      published_year=rng.randint(1900, 2020), genres=rng.sample(GENRES, k=rng.randint(1, 3)),
+                      author_names=rng.sample(AUTHORS, k=rng.randint(1, 2)))
+
+
+async def assert_consistent(db, columns: CatalogColumns, rng: random.Random, queries: int = 200):
+    for i in range(queries):
+        filters = random_filters(rng)
+        sort_by = rng.choice(["title", "published_year"])
+        limit = rng.choice([1, 10, 50])
+        if i % 2:
+            skip = rng.choice([0, 10, rng.randrange(len(columns))])
+            expected = await book_crud.get_books(db, skip=skip, limit=limit, sort_by=sort_by, **filters)
+            actual = columns.query(sort_by, skip, limit, **filters)
+        else:
+            page = await book_crud.get_books_page(db, limit=limit, sort_by=sort_by, **filters)
+            if page["next_cursor"] is None:
+                continue
+            cursor = page["next_cursor"]
+            expected = (await book_crud.get_books_page(db, cursor=cursor, limit=limit, sort_by=sort_by,
+                                                       **filters))["items"]
+            actual = columns.query(sort_by, 0, limit, after=decode_cursor(cursor, sort_by), **filters)
+        assert actual is not None
+        assert normalized(actual) == normalized(expected), (sort_by, filters)
+
+
+async def test_snapshot_matches_sql_before_and_after_writes(db):
+    rng = random.Random(42)
+    await _renew_change_log(db, 3600)
+    await book_crud.ingest_chunk(db, [random_book(rng, i) for i in range(300)])
+    await db.execute(text("UPDATE books SET published_year = NULL WHERE title LIKE '%River%'"))
+    await db.commit()
+    columns = await _load_columns(db, 50)
+    assert len(columns) == 300
+    await assert_consistent(db, columns, rng)
+
+    ids = list(columns.positions)
+    await book_crud.create_book(db, BookCreate(title="A New First", published_year=1950, genres=["Fiction"],
+                                               author_names=["Zoe Newcomer"]))
+    await book_crud.update_book(db, str(ids[0]), BookUpdate(title="Zzz Moved To The End"))
+    await book_crud.update_book(db, str(ids[1]), BookUpdate(published_year=2001, author_names=["Yuri Other"]))
+    await book_crud.delete_book(db, str(ids[2]))
+    await book_crud.ingest_chunk(db, [random_book(rng, 300 + i) for i in range(20)])
+
+    refreshed = await _load_changes(db, columns, 1000, 50)
+    assert refreshed is not None and refreshed is not columns
+    assert refreshed.version == await book_crud.get_catalog_version(db)
+    await db.commit()
+    full = await _load_columns(db, 50)
+    assert rows(refreshed) == rows(full)
+    assert year_ids(refreshed) == year_ids(full)
+    assert refreshed.title_masks == full.title_masks and refreshed.year_masks == full.year_masks
+    await assert_consistent(db, refreshed, rng)
+
+    # Nothing changed since: the same columns, now based on the newer snapshot.
+    assert await _load_changes(db, refreshed, 1000, 50) is refreshed
+    # Too many changes for a delta.
+    await book_crud.ingest_chunk(db, [random_book(rng, 400 + i) for i in range(5)])
+    assert await _load_changes(db, refreshed, 3, 50) is None
+
+
+async def test_changes_are_logged_only_under_the_lease(db):
+    await book_crud.create_book(db, BookCreate(title="Unlogged", genres=["Fiction"], author_names=["Ada Abbott"]))
+    assert (await db.execute(text("SELECT count(*) FROM catalog_changes"))).scalar_one() == 0
+    await _renew_change_log(db, 3600)
+    await book_crud.create_book(db, BookCreate(title="Logged", genres=["Fiction"], author_names=["Ada Abbott"]))
+    assert (await db.execute(text("SELECT count(*) FROM catalog_changes"))).scalar_one() > 0
+    await db.commit()
+
+
+def build(books: dict, version: int) -> CatalogColumns:
+    # What a full load produces for ``books``: title and year order as Postgres sorts ASCII titles under "C".
+    columns = CatalogColumns(version)
+    for name in sorted({name for book in books.values() for name in book["authors"]}):
+        columns._add_author(uuid.uuid5(uuid.NAMESPACE_OID, name), name)
+    for book_id, book in sorted(books.items(), key=lambda item: (item[1]["title"], item[0])):
+        columns._add_book(book_id, book["title"], _fold(book["title"]), book["year"], tuple(book["genres"]),
+                          [columns.author_index[uuid.uuid5(uuid.NAMESPACE_OID, name)] for name in book["authors"]])
+    columns.year_order.extend(sorted(range(len(columns)), key=columns._year_key))
+    return columns
+
+
+def change_rows(books: dict, changed: set):
+    # The rows _load_changes reads: changed books that still exist, with the id of the book after each.
+    ordered = sorted(books, key=lambda book_id: (books[book_id]["title"], book_id))
+    following = dict(zip(ordered, ordered[1:] + [None]))
+    return [(book_id, books[book_id]["title"], None if books[book_id]["year"] == NO_YEAR else books[book_id]["year"],
+             books[book_id]["genres"], [uuid.uuid5(uuid.NAMESPACE_OID, name) for name in books[book_id]["authors"]],
+             following[book_id])
+            for book_id in ordered if book_id in changed]
+
+
+@pytest.mark.parametrize("seed", range(20))
+async def test_apply_changes_matches_full_build(seed):
+    rng = random.Random(seed)
+
+    def random_record():
+        return {"title": f"{rng.choice(WORDS)} {rng.randrange(10)}", "year": rng.choice([NO_YEAR, *range(1990, 2000)]),
+                "genres": rng.sample(GENRES, k=rng.randint(1, 2)), "authors": rng.sample(AUTHORS, k=rng.randint(0, 2))}
+
+    books = {uuid.UUID(int=rng.getrandbits(128)): random_record() for _ in range(rng.randint(0, 60))}
+    old = build(books, 1)
+    await old._index(7)
+    before = rows(old)
+    changed = set()
+    for _ in range(rng.randint(1, 20)):
+        action = rng.random()
+        if books and action < 0.3:
+            book_id = rng.choice(list(books))
+            del books[book_id]
+        elif books and action < 0.7:
+            book_id = rng.choice(list(books))
+            books[book_id] = dict(books[book_id], **{key: value for key, value in random_record().items()
+                                                     if rng.random() < 0.5})
+        else:
+            book_id = uuid.UUID(int=rng.getrandbits(128))
+            books[book_id] = dict(random_record(), authors=[f"New {rng.randrange(3)}"])
+        changed.add(book_id)
+    new_authors = sorted({name for book in books.values() for name in book["authors"]} - set(old.author_names))
+    authors = [(uuid.uuid5(uuid.NAMESPACE_OID, name), name) for name in new_authors]
+
+    applied = await _apply_changes(old, 2, None, changed, change_rows(books, changed), authors, 7)
+    expected = build(books, 2)
+    await expected._index(7)
+    assert rows(applied) == rows(expected)
+    assert year_ids(applied) == year_ids(expected)
+    assert applied.title_masks == expected.title_masks and applied.year_masks == expected.year_masks
+    assert list(applied.years_by_rank) == list(expected.years_by_rank)
+    # Listings may still be reading the old columns.
+    assert rows(old) == before
+
+
+async def test_apply_changes_gives_up_on_unknown_neighbour():
+    books = {uuid.UUID(int=1): {"title": "A", "year": 2000, "genres": ["Fiction"], "authors": []}}
+    old = build(books, 1)
+    await old._index(10)
+    new_id = uuid.UUID(int=2)
+    neighbour_rows = [(new_id, "0", 2000, ["Fiction"], [], uuid.UUID(int=3))]
+    assert await _apply_changes(old, 2, None, {new_id}, neighbour_rows, [], 10) is None
+
+
+async def test_non_ascii_titles_and_authors_fall_back_to_sql():
+    books = {
+        uuid.UUID(int=1): {"title": "Garden", "year": 2000, "genres": ["Fiction"], "authors": ["Ada Abbott"]},
+        uuid.UUID(int=2): {"title": "\u0130stanbul Garden", "year": 2001, "genres": ["Fiction"], "authors": []},
+    }
+    columns = build(books, 1)
+    await columns._index(10)
+    # Postgres and Python may fold "\u0130" differently, so whether it matches "i" is left to ILIKE.
+    assert columns.query("title", 0, 10, title="ist") is None
+    assert [book["title"] for book in columns.query("title", 0, 1, title="garden")] == ["Garden"]
+    assert [book["title"] for book in columns.query("title", 0, 10)] == ["Garden", "\u0130stanbul Garden"]
+    assert [book["title"] for book in columns.query("title", 0, 10, author="ada")] == ["Garden"]
+
+    books[uuid.UUID(int=3)] = {"title": "Zebra", "year": 2002, "genres": ["Fiction"], "authors": ["\u212aarl"]}
+    columns = build(books, 2)
+    await columns._index(10)
+    assert columns.query("title", 0, 10, author="karl") is None
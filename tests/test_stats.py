@@ -0,0 +1,10 @@
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.jwt import create_access_token
+
+
+def test_stats_require_a_token():
+    client = TestClient(app)
+    assert client.get("/stats/cache").status_code == 401
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'ops'})}"}
+    assert client.get("/stats/cache", headers=headers).status_code == 200
@@ -0,0 +1,73 @@
+import pytest
+import json
+from app.utils.stream import csv_lines, iter_csv_records, iter_json_array
+
+pytestmark = pytest.mark.anyio
+
+HEADER = b"title,published_year,genres,author_names\n"
+
+
+async def chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def records(data: bytes, size: int = 7):
+    return [record async for record in iter_csv_records(chunks(data, size))]
+
+
+async def test_quoted_field_with_newline():
+    data = HEADER + b'"Two\nLines, and a ""quote""",2001,Fiction,Ada|Boris\nPlain,1999,Science,Chen\n'
+    assert await records(data) == [
+        (2, {"title": 'Two\nLines, and a "quote"', "published_year": "2001", "genres": ["Fiction"],
+             "author_names": ["Ada", "Boris"]}),
+        (4, {"title": "Plain", "published_year": "1999", "genres": ["Science"], "author_names": ["Chen"]}),
+    ]
+
+
+async def test_quote_inside_unquoted_field_is_literal():
+    data = HEADER + b'5" Floppy,1985,Science,Ada\nNext,1990,Science,Boris\n'
+    assert [record["title"] for _, record in await records(data)] == ['5" Floppy', "Next"]
+
+
+async def test_unterminated_quote_is_reported():
+    line_no, error = (await records(HEADER + b'"Open,2001,Fiction,Ada\n'))[-1]
+    assert line_no == 2 and isinstance(error, ValueError)
+
+
+async def test_column_count_mismatch_keeps_going():
+    data = HEADER + b"Short,2001\nFull,2002,Fiction,Ada\n"
+    parsed = await records(data)
+    assert isinstance(parsed[0][1], ValueError)
+    assert parsed[1] == (3, {"title": "Full", "published_year": "2002", "genres": ["Fiction"], "author_names": ["Ada"]})
+
+
+@pytest.mark.parametrize("size", [1, 5, 4096])
+async def test_export_round_trip(size):
+    rows = [
+        {"title": "Multi\nline\r\ntitle", "published_year": 2001, "genres": ["Fiction", "Fantasy"],
+         "author_names": ["Ada, Jr.", 'The "Boris"']},
+        {"title": "", "published_year": None, "genres": ["Memoir"], "author_names": ["Chen"]},
+    ]
+    data = HEADER + csv_lines(rows, ["title", "published_year", "genres", "author_names"])
+    parsed = [record for _, record in await records(data, size)]
+    assert parsed == [
+        {"title": "Multi\nline\ntitle", "published_year": "2001", "genres": ["Fiction", "Fantasy"],
+         "author_names": ["Ada, Jr.", 'The "Boris"']},
+        {"title": "", "published_year": "", "genres": ["Memoir"], "author_names": ["Chen"]},
+    ]
+
+
+ARRAY = [{"title": "Zoë", "authors": ["読書"], "year": 1999}, 42, -0.5e-3, "s", [], {}, None, True]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1024])
+async def test_json_array_elements_across_chunks(size):
+    for data in (json.dumps(ARRAY), json.dumps(ARRAY, indent=2, ensure_ascii=False)):
+        assert [value async for value in iter_json_array(chunks(data.encode(), size))] == ARRAY
+
+
+@pytest.mark.parametrize("data", [b"", b"{}", b"[1,", b"[1 2]", b"[1]x", b"[,1]", b"[1,]", b'["open'])
+async def test_malformed_json_array_is_rejected(data):
+    with pytest.raises(ValueError):
+        [value async for value in iter_json_array(chunks(data, 2))]
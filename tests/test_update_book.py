@@ -0,0 +1,40 @@
+import anyio
+import httpx
+import pytest
+from sqlalchemy import func, select
+from app.main import app
+from app.models.model_base import Author
+from app.utils.jwt import create_access_token
+
+pytestmark = pytest.mark.anyio
+
+BOOK = {"title": "Before", "published_year": 2001, "genres": ["Fiction"], "author_names": ["Known Author"]}
+
+
+@pytest.fixture
+async def client(db):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'writer'})}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test",
+                                 headers=headers) as client:
+        yield client
+
+
+async def test_put_with_unseen_author_completes(client):
+    created = await client.post("/api/v1/books/", json=BOOK)
+    assert created.status_code == 201
+    # The resolver inserts the new author in its own transaction; it must not wait on the book update.
+    with anyio.fail_after(10):
+        response = await client.put(f"/api/v1/books/{created.json()['id']}",
+                                    json={"title": "After", "author_names": ["Known Author", "Unseen Author"]})
+    assert response.status_code == 200
+    assert response.json()["title"] == "After"
+    assert sorted(response.json()["authors"]) == ["Known Author", "Unseen Author"]
+
+
+async def test_put_missing_book_leaves_no_new_authors(client, db):
+    with anyio.fail_after(10):
+        response = await client.put("/api/v1/books/00000000-0000-0000-0000-000000000000",
+                                    json={"author_names": ["Nobody's Author"]})
+    assert response.status_code == 404
+    authors = await db.scalar(select(func.count()).select_from(Author).where(Author.name == "Nobody's Author"))
+    assert authors == 0
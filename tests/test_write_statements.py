@@ -0,0 +1,60 @@
+import pytest
+from app.crud import book as book_crud
+from app.schemas.book import BookCreate, BookUpdate
+from app.utils.profiling import RequestProfile, current_profile
+
+pytestmark = pytest.mark.anyio
+
+
+async def count_statements(coro):
+    # The resolver's flush task is started from this context, so its statements count too.
+    profile = RequestProfile()
+    token = current_profile.set(profile)
+    try:
+        result = await coro
+    finally:
+        current_profile.reset(token)
+    return result, profile.statements
+
+
+def new_book(title: str, authors: int, prefix: str = "Author") -> BookCreate:
+    return BookCreate(title=title, published_year=2001, genres=["Fiction"],
+                      author_names=[f"{prefix} {i}" for i in range(authors)])
+
+
+@pytest.mark.parametrize("authors", [1, 25])
+async def test_create_book_statements(db, authors):
+    # Unknown authors: resolver lookup and insert, book insert, link insert, reload.
+    book, statements = await count_statements(book_crud.create_book(db, new_book("First", authors)))
+    assert len(book.authors) == authors
+    assert statements == 5
+
+    # Resolved authors are cached: book insert, link insert, reload.
+    book, statements = await count_statements(book_crud.create_book(db, new_book("Second", authors)))
+    assert len(book.authors) == authors
+    assert statements == 3
+
+
+@pytest.mark.parametrize("authors", [1, 25])
+async def test_update_book_statements(db, authors):
+    book = await book_crud.create_book(db, new_book("Before", authors))
+    book_id, names = book.id, [author.name for author in book.authors]
+    # Each call below must load the book afresh, not return the instance this session already holds.
+    db.expunge_all()
+
+    # Row update and reload.
+    _, statements = await count_statements(book_crud.update_book(db, book_id, BookUpdate(title="After")))
+    assert statements == 2
+    db.expunge_all()
+
+    # Same authors: row update, link delete, link insert, reload.
+    _, statements = await count_statements(book_crud.update_book(db, book_id, BookUpdate(author_names=names)))
+    assert statements == 4
+    db.expunge_all()
+
+    # New authors: resolver lookup and insert, row update, link delete, link insert,
+    # orphaned author delete, reload.
+    other = BookUpdate(author_names=[f"Other {i}" for i in range(authors)])
+    updated, statements = await count_statements(book_crud.update_book(db, book_id, other))
+    assert sorted(author.name for author in updated.authors) == sorted(other.author_names)
+    assert statements == 7